@@ -12,8 +12,10 @@ router = APIRouter(
 )
 router.route_class = LoggedRoute
 
+# sync handlers: the SQLAlchemy session runs in the threadpool, not on the event loop; bcrypt
+# runs on password_hasher's own pool, whose pending limit keeps a login burst to a few threads
 @router.post("/register", response_model=BaseResponse[str])
-async def register(request: RegisterRequest):
+def register(request: RegisterRequest):
     user_service = UserService()
     response = user_service.register(request)
     return JSONResponse(status_code=response.statusCode, content=response.dict())
@@ -24,31 +26,31 @@ async def test():
 
 #after verify redirect users to login page.
 @router.post("/verify-email", response_model=BaseResponse[str])
-async def verify_email(token: str = Query(...)):
+def verify_email(token: str = Query(...)):
     user_service = UserService()
     response = user_service.verify_email(token)
     return JSONResponse(status_code=response.statusCode, content=response.dict())
 
 @router.post("/login", response_model=BaseResponse[str])
-async def login(request: LoginRequest):
+def login(request: LoginRequest):
     user_service = UserService()
     response = user_service.login(request)
     return JSONResponse(status_code=response.statusCode, content=response.dict())
 
 @router.post("/forgot-password", response_model=BaseResponse[str])
-async def forgot_password(request: ForgotPasswordRequest):
+def forgot_password(request: ForgotPasswordRequest):
     user_service = UserService()
     response = user_service.forgot_password(request.email)
     return JSONResponse(status_code=response.statusCode, content=response.dict())
 
 @router.post("/forgot-password-link", response_model=BaseResponse[str])
-async def update_password_change_process(token: str = Query(...)):
+def update_password_change_process(token: str = Query(...)):
     user_service = UserService()
     response = user_service.update_password_change_process(token)
     return JSONResponse(status_code=response.statusCode, content=response.dict())
 
 @router.post("/update-password", response_model=BaseResponse[str])
-async def update_password(request: UpdatePasswordRequest):
+def update_password(request: UpdatePasswordRequest):
     user_service = UserService()
     response = user_service.update_password(request.token, request.password)
     return JSONResponse(status_code=response.statusCode, content=response.dict())
@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.schemas.response_schema import BaseResponse
+from app.services.email_service import EmailService
+
+
+router = APIRouter(
+    prefix="/email",
+    tags=["email"]
+)
+
+# bounce and complaint events from the email provider; the raw body is needed for the signature
+@router.post('/webhook', response_model=BaseResponse[str])
+async def webhook(request: Request):
+    body = await request.body()
+    emailService = EmailService()
+    res = emailService.handle_provider_webhook(request.headers, body)
+    return JSONResponse(status_code=res.statusCode, content=jsonable_encoder(res))
@@ -0,0 +1,35 @@
+import hmac
+import os
+
+from fastapi import APIRouter, Header
+from fastapi.responses import PlainTextResponse
+
+from app.infra.email_dedup import email_dedup
+from app.infra.email_suppression import suppression_list
+from app.scheduler.send_queue import dispatch_queue
+from app.services.outbox_service import outbox_metrics, render_outbox_backlog
+from app.utils.auth_bearer import verified_tokens
+from app.utils.metrics import dependency_metrics
+from app.utils.password_hasher import password_hasher
+
+METRICS_SOURCES = (dependency_metrics, verified_tokens, password_hasher, outbox_metrics, email_dedup,
+                   suppression_list, dispatch_queue)
+
+
+router = APIRouter(
+    tags=["metrics"]
+)
+
+# scrapers must send it as a bearer token; without one configured /metrics doesn't exist
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+@router.get('/metrics', response_class=PlainTextResponse, include_in_schema=False)
+async def metrics(authorization: str = Header(default="")):
+    if not METRICS_TOKEN:
+        return PlainTextResponse("not found\n", status_code=404)
+    if not hmac.compare_digest(authorization, f"Bearer {METRICS_TOKEN}"):
+        return PlainTextResponse("unauthorized\n", status_code=401)
+    body = "".join(source.render_prometheus() for source in METRICS_SOURCES)
+    # the outbox backlog (paced dispatch included) comes from the database, not this process
+    body += await render_outbox_backlog()
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
@@ -1,9 +1,14 @@
-from sqlalchemy import create_engine
+import time
+from typing import Optional
+import asyncpg
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 import os
 
+from app.utils.metrics import dependency_metrics
+
 load_dotenv()
 
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
@@ -12,6 +17,22 @@ engine = create_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+# time every statement so request logs and /metrics show how much of a request was the DB
+@event.listens_for(engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+@event.listens_for(engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    dependency_metrics.observe("postgres", "query", time.perf_counter() - conn.info["query_started"].pop())
+
+@event.listens_for(engine, "handle_error")
+def _handle_error(exception_context):
+    started = exception_context.connection.info.get("query_started") if exception_context.connection else None
+    if started:
+        dependency_metrics.observe("postgres", "query", time.perf_counter() - started.pop(), failed=True)
+
+
 Base = declarative_base()
 
 def get_db():
@@ -19,4 +40,39 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+
+# asyncpg pool shared by the notifier and other background jobs
+ASYNC_POOL_MIN_SIZE = int(os.getenv("ASYNC_POOL_MIN_SIZE", "1"))
+ASYNC_POOL_MAX_SIZE = int(os.getenv("ASYNC_POOL_MAX_SIZE", "5"))
+ASYNC_POOL_STATEMENT_CACHE_SIZE = int(os.getenv("ASYNC_POOL_STATEMENT_CACHE_SIZE", "100"))
+ASYNC_POOL_MAX_INACTIVE_LIFETIME = float(os.getenv("ASYNC_POOL_MAX_INACTIVE_LIFETIME", "300"))
+
+_async_pool: Optional[asyncpg.Pool] = None
+
+async def create_async_pool(**pool_kwargs) -> asyncpg.Pool:
+    global _async_pool
+    if _async_pool is None:
+        _async_pool = await asyncpg.create_pool(
+            SQLALCHEMY_DATABASE_URL,
+            min_size=ASYNC_POOL_MIN_SIZE,
+            max_size=ASYNC_POOL_MAX_SIZE,
+            statement_cache_size=ASYNC_POOL_STATEMENT_CACHE_SIZE,
+            max_inactive_connection_lifetime=ASYNC_POOL_MAX_INACTIVE_LIFETIME,
+            **pool_kwargs,
+        )
+    return _async_pool
+
+async def get_async_pool() -> asyncpg.Pool:
+    # lazily created for jobs started outside of the app lifespan
+    if _async_pool is None:
+        return await create_async_pool()
+    return _async_pool
+
+async def close_async_pool():
+    global _async_pool
+    if _async_pool is not None:
+        pool = _async_pool
+        _async_pool = None
+        await pool.close()
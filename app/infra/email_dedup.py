@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta, timezone
+import logging
+import os
+import threading
+from typing import Optional
+
+from cachetools import TTLCache
+from dotenv import load_dotenv
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.utils.metrics import prometheus_metric
+
+load_dotenv()
+
+logging.basicConfig(
+    format="%(asctime)s [%(process)d] [%(levelname)s] %(message)s",
+    level=logging.INFO
+)
+
+# the same destination gets a given email at most once per window; 0 disables
+EMAIL_DEDUP_WINDOW_SECONDS = int(os.getenv("EMAIL_DEDUP_WINDOW_SECONDS", "300"))
+EMAIL_DEDUP_CACHE_SIZE = int(os.getenv("EMAIL_DEDUP_CACHE_SIZE", "50000"))
+
+
+class EmailDedup:
+    """
+    Cooldown per (destination, template key) across every worker.
+
+    A local TTL cache answers repeat sends without touching the database. Otherwise
+    the email_cooldowns row is claimed in the caller's session with one upsert that
+    only succeeds if the window has passed, so concurrent workers can't both send.
+    The cache only learns about a claim once that session commits; a rollback
+    releases the claim everywhere.
+    """
+
+    def __init__(self, window_seconds: int = EMAIL_DEDUP_WINDOW_SECONDS, cache_size: int = EMAIL_DEDUP_CACHE_SIZE):
+        self.window = timedelta(seconds=window_seconds)
+        self._lock = threading.Lock()
+        # key -> when the cooldown ends
+        self._cache = TTLCache(maxsize=cache_size, ttl=max(window_seconds, 1))
+        self.suppressed = {}
+        self.allowed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.window.total_seconds() > 0
+
+    def allow(self, db, destination: str, template_key: str, now: Optional[datetime] = None) -> bool:
+        """Claim a send; False means the destination got this email within the window."""
+        if not self.enabled:
+            return True
+        now = now or datetime.now(timezone.utc)
+        key = (destination.lower().strip(), template_key)
+
+        with self._lock:
+            until = self._cache.get(key)
+        if until is not None and until > now:
+            return self._suppress(key)
+
+        claimed = db.execute(text("""
+            INSERT INTO email_cooldowns (destination_email, template_key, last_sent_at)
+            VALUES (:destination, :template_key, :now)
+            ON CONFLICT (destination_email, template_key) DO UPDATE
+                SET last_sent_at = EXCLUDED.last_sent_at
+                WHERE email_cooldowns.last_sent_at <= :cutoff
+            RETURNING last_sent_at
+        """), {"destination": key[0], "template_key": template_key, "now": now,
+               "cutoff": now - self.window}).first()
+
+        if claimed is not None:
+            self._remember_on_commit(db, key, now + self.window)
+            with self._lock:
+                self.allowed += 1
+            return True
+
+        # another worker sent it; remember until its window ends
+        last_sent_at = db.execute(text("""
+            SELECT last_sent_at FROM email_cooldowns
+            WHERE destination_email = :destination AND template_key = :template_key
+        """), {"destination": key[0], "template_key": template_key}).scalar()
+        if last_sent_at is not None:
+            # may be this session's own uncommitted claim, so it waits for the commit too
+            self._remember_on_commit(db, key, last_sent_at + self.window)
+        return self._suppress(key)
+
+    def _remember_on_commit(self, db, key: tuple, until: datetime):
+        db.info.setdefault(_PENDING_KEY, []).append((self, key, until))
+
+    def _remember(self, key: tuple, until: datetime):
+        with self._lock:
+            self._cache[key] = until
+
+    def _suppress(self, key: tuple) -> bool:
+        template_key = key[1].split(":", 1)[0]
+        with self._lock:
+            self.suppressed[template_key] = self.suppressed.get(template_key, 0) + 1
+        logging.info(f"-- suppressed duplicate {key[1]} email to {key[0]} within {int(self.window.total_seconds())}s")
+        return False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"allowed": self.allowed, "suppressed": dict(self.suppressed), "cached": len(self._cache)}
+
+    def render_prometheus(self) -> str:
+        stats = self.stats()
+        return prometheus_metric(
+            "email_dedup_allowed_total", "counter", "Emails let through the cooldown check.", [(None, stats["allowed"])]
+        ) + prometheus_metric(
+            "email_dedup_suppressed_total", "counter", "Repeat emails suppressed within the cooldown window, by template.",
+            (({"template": template}, count) for template, count in sorted(stats["suppressed"].items()))
+        )
+
+
+email_dedup = EmailDedup()
+
+# cooldowns claimed in a session, cached locally once it commits
+_PENDING_KEY = "email_dedup_pending"
+
+@event.listens_for(Session, "after_commit")
+def _cache_committed_cooldowns(session):
+    for dedup, key, until in session.info.pop(_PENDING_KEY, ()):
+        dedup._remember(key, until)
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back_cooldowns(session):
+    session.info.pop(_PENDING_KEY, None)
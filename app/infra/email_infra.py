@@ -1,50 +1,127 @@
 import logging
 import os
-import resend
+import threading
+import time
+from typing import Dict, Iterable, List, Tuple
+
+import httpx
+from jinja2 import Environment, Template
 from dotenv import load_dotenv
 
+from app.infra.email_dedup import email_dedup
+from app.infra.email_suppression import suppression_list
+from app.infra.email_transport import get_email_backend, is_recipient_rejection
+from app.models.email_model import EmailOutboxModel
+
 load_dotenv()
 #
 logging.basicConfig(
     format="%(asctime)s [%(process)d] [%(levelname)s] %(message)s",
     level=logging.INFO
 )
+
+TEMPLATE_DIR = os.path.dirname(os.path.abspath(__file__))
+# template files are stat'ed for changes at most this often; 0 checks on every render
+TEMPLATE_RELOAD_CHECK_SECONDS = float(os.getenv("TEMPLATE_RELOAD_CHECK_SECONDS", "2"))
+
+
+class EmailTemplates:
+    """
+    Email templates compiled once, already wrapped in container.html, and cached.
+
+    A template is recompiled when its file or the container's mtime changes.
+    """
+
+    def __init__(self, directory: str = TEMPLATE_DIR, check_seconds: float = TEMPLATE_RELOAD_CHECK_SECONDS):
+        self.directory = directory
+        self.check_seconds = check_seconds
+        # every template is an .html file, so values are always HTML-escaped
+        self.environment = Environment(autoescape=True, keep_trailing_newline=True)
+        self._lock = threading.Lock()
+        # type -> (mtimes, next check, compiled template)
+        self._compiled: Dict[str, Tuple[tuple, float, Template]] = {}
+
+    def get(self, type: str) -> Template:
+        now = time.monotonic()
+        cached = self._compiled.get(type)
+        if cached and now < cached[1]:
+            return cached[2]
+
+        paths = (os.path.join(self.directory, f"{type}.html"), os.path.join(self.directory, "container.html"))
+        mtimes = tuple(os.stat(path).st_mtime_ns for path in paths)
+        with self._lock:
+            cached = self._compiled.get(type)
+            if cached and cached[0] == mtimes:
+                template = cached[2]
+            else:
+                with open(paths[0], "r") as file:
+                    html = file.read()
+                with open(paths[1], "r") as file:
+                    container_html = file.read()
+                template = self.environment.from_string(container_html.replace("{{content}}", html))
+                if cached:
+                    logging.info(f"-- reloaded email template {type}")
+            self._compiled[type] = (mtimes, now + self.check_seconds, template)
+        return template
+
+
+email_templates = EmailTemplates()
+
+
 class EmailInfra:
-    def __init__(self):
-        resend.api_key = os.getenv("RESEND_API_KEY")
-
-    def send_email(self, destinationEmail: str, subject: str, type: str, object: dict):
-        file_path = f"app/infra/{type}.html"
-        with open(file_path, "r") as file:
-            html = file.read()
-        placeholders = {
-            "{{ link }}": object.get("link", ""),
-            "{{ creator_email }}": object.get("creator_email", ""),
-            "{{ accept_link }}": object.get("accept_link", ""),
-            "{{ reject_link }}": object.get("reject_link", ""),
-            "{{ project_name }}": object.get("project_name", ""),
-        }
+    def enqueue_email(self, db, destinationEmail: str, subject: str, type: str, object: dict,
+                      dedup_scope: str = None) -> bool:
+        """
+        Add the email to the outbox in the caller's session; it is sent by the outbox
+        worker once that transaction commits, so the request never waits on the provider.
+
+        The same email (type, plus dedup_scope when given, e.g. a project id) to the same
+        destination within the cooldown window is suppressed, as is anything to an address
+        on the suppression list. Returns False if it was.
+        """
+        if suppression_list.should_skip(destinationEmail, type):
+            return False
+        if not email_dedup.allow(db, destinationEmail, f"{type}:{dedup_scope}" if dedup_scope else type):
+            return False
+        db.add(EmailOutboxModel(
+            destination_email=destinationEmail,
+            subject=subject,
+            template=type,
+            context=object,
+        ))
+        return True
 
-        for key, value in placeholders.items():
-            html = html.replace(key, value)
+    def render_email(self, type: str, object: dict) -> str:
+        return email_templates.get(type).render(object)
 
-            
-        container_path = f"app/infra/container.html"
-        with open(container_path, "r") as file:
-            container_html = file.read()
-        
-        full_content = container_html.replace("{{content}}", html)
-        params = {
+    def render_many(self, type: str, objects: Iterable[dict]) -> List[str]:
+        """Render one template against many contexts, e.g. a link per check-in member."""
+        template = email_templates.get(type)
+        return [template.render(object) for object in objects]
+
+    def build_params(self, destinationEmail: str, subject: str, full_content: str) -> dict:
+        return {
             "from": "DoTellBoard <no_reply@notifications.dotellboard.com>",
             "to": destinationEmail,
             "subject": subject,
             "html": full_content
         }
 
+    async def send_html_async(self, destinationEmail: str, subject: str, full_content: str):
+        """Send one email now through the shared backend, without blocking the event loop."""
+        if suppression_list.should_skip(destinationEmail, "dispatch"):
+            return None
+        params = self.build_params(destinationEmail, subject, full_content)
+
         try:
-            email = resend.Emails.send(params)
-            logging.info('email sent successfully', email)
+            email = await get_email_backend().send(params)
+            logging.info('email sent successfully %s', email)
             return email
+        except httpx.HTTPStatusError as e:
+            logging.info(f"Failed to send email: {e} {e.response.text[:500]}")
+            if is_recipient_rejection(e, destinationEmail):
+                await suppression_list.suppress_async(destinationEmail, "invalid", e.response.text[:500])
+            return None
         except Exception as e:
             logging.info(f"Failed to send email: {e}")
             return None
@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+from app.core.database import get_async_pool
+from app.utils.metrics import prometheus_metric
+
+load_dotenv()
+
+logging.basicConfig(
+    format="%(asctime)s [%(process)d] [%(levelname)s] %(message)s",
+    level=logging.INFO
+)
+
+# how often each process picks up addresses suppressed by other processes
+EMAIL_SUPPRESSION_REFRESH_SECONDS = float(os.getenv("EMAIL_SUPPRESSION_REFRESH_SECONDS", "60"))
+# each refresh re-reads this much before the last one, for rows whose transaction
+# started earlier (date_created is the database's now()) but committed since
+EMAIL_SUPPRESSION_REFRESH_OVERLAP_SECONDS = float(os.getenv("EMAIL_SUPPRESSION_REFRESH_OVERLAP_SECONDS", "300"))
+
+UPSERT_SUPPRESSION_SQL = """
+    INSERT INTO email_suppressions (email, reason, detail, date_created)
+    VALUES ({email}, {reason}, {detail}, now())
+    ON CONFLICT (email) DO NOTHING
+"""
+
+
+def _fingerprint(email: str) -> int:
+    # 8 bytes per address instead of the string; a collision is ~2^-64 per lookup
+    return int.from_bytes(hashlib.blake2b(email.lower().strip().encode(), digest_size=8).digest(), "big")
+
+
+class SuppressionList:
+    """
+    In-memory copy of email_suppressions, checked before every send.
+
+    Holds a 64-bit fingerprint per address, so lookups never touch the database.
+    The copy is refreshed incrementally from the table by the background loops.
+    """
+
+    def __init__(self, refresh_seconds: float = EMAIL_SUPPRESSION_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._fingerprints = set()
+        self._lock = threading.Lock()
+        self._loaded_until: Optional[datetime] = None
+        self._next_refresh = 0.0
+        self.skipped = {}
+
+    def __len__(self) -> int:
+        return len(self._fingerprints)
+
+    def contains(self, email: str) -> bool:
+        return bool(email) and _fingerprint(email) in self._fingerprints
+
+    def should_skip(self, email: str, source: str) -> bool:
+        """True (and counted) if email is suppressed; call right before sending."""
+        if not self.contains(email):
+            return False
+        with self._lock:
+            self.skipped[source] = self.skipped.get(source, 0) + 1
+        return True
+
+    def add(self, email: str):
+        with self._lock:
+            self._fingerprints.add(_fingerprint(email))
+
+    def suppress(self, db, email: str, reason: str, detail: str = None):
+        """Record an address in the caller's session (e.g. from a bounce webhook)."""
+        db.execute(text(UPSERT_SUPPRESSION_SQL.format(email=":email", reason=":reason", detail=":detail")),
+                   {"email": email.lower().strip(), "reason": reason, "detail": detail})
+        self.add(email)
+
+    async def suppress_async(self, email: str, reason: str, detail: str = None):
+        try:
+            pool = await get_async_pool()
+            async with pool.acquire() as conn:
+                await conn.execute(UPSERT_SUPPRESSION_SQL.format(email="$1", reason="$2", detail="$3"),
+                                   email.lower().strip(), reason, detail)
+            self.add(email)
+            logging.info(f"-- suppressed {email}: {reason}")
+        except Exception as e:
+            logging.error("suppress_async failed with ex: %s", e)
+
+    async def refresh(self, force: bool = False):
+        """Load addresses suppressed since the last refresh, at most every refresh_seconds."""
+        if not force and time.monotonic() < self._next_refresh:
+            return
+        self._next_refresh = time.monotonic() + self.refresh_seconds
+        try:
+            pool = await get_async_pool()
+            async with pool.acquire() as conn:
+                # the cursor is on the database clock, so app hosts' clocks don't matter
+                read_at = await conn.fetchval("SELECT now()")
+                rows = await conn.fetch("""
+                    SELECT email FROM email_suppressions
+                    WHERE $1::timestamptz IS NULL OR date_created >= $1::timestamptz
+                """, self._loaded_until)
+            if rows:
+                fingerprints = [_fingerprint(row['email']) for row in rows]
+                with self._lock:
+                    self._fingerprints.update(fingerprints)
+            self._loaded_until = read_at - timedelta(seconds=EMAIL_SUPPRESSION_REFRESH_OVERLAP_SECONDS)
+        except Exception as e:
+            logging.error("suppression list refresh failed with ex: %s", e)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"addresses": len(self._fingerprints), "skipped": dict(self.skipped)}
+
+    def render_prometheus(self) -> str:
+        stats = self.stats()
+        return prometheus_metric(
+            "email_suppression_addresses", "gauge", "Addresses on the suppression list.", [(None, stats["addresses"])]
+        ) + prometheus_metric(
+            "email_suppression_skipped_total", "counter", "Sends skipped because the address is suppressed, by source.",
+            (({"source": source}, count) for source, count in sorted(stats["skipped"].items()))
+        )
+
+
+suppression_list = SuppressionList()
@@ -0,0 +1,153 @@
+from abc import ABC, abstractmethod
+import asyncio
+import itertools
+import logging
+import os
+from typing import Dict, List, Optional, Type
+
+import httpx
+from dotenv import load_dotenv
+
+from app.utils.metrics import track_dependency
+
+load_dotenv()
+
+logging.basicConfig(
+    format="%(asctime)s [%(process)d] [%(levelname)s] %(message)s",
+    level=logging.INFO
+)
+# httpx logs every request at INFO, which would be a line per email
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+# "resend" talks HTTP to EMAIL_API_URL; "null" accepts every email without sending it
+EMAIL_BACKEND = os.getenv("EMAIL_BACKEND", "resend")
+# point at benchmarks/email_stub_server.py to exercise the HTTP path without the provider
+EMAIL_API_URL = os.getenv("EMAIL_API_URL", "https://api.resend.com")
+EMAIL_MAX_CONCURRENCY = int(os.getenv("EMAIL_MAX_CONCURRENCY", "20"))
+EMAIL_CONNECT_TIMEOUT_SECONDS = float(os.getenv("EMAIL_CONNECT_TIMEOUT_SECONDS", "5"))
+EMAIL_TIMEOUT_SECONDS = float(os.getenv("EMAIL_TIMEOUT_SECONDS", "15"))
+EMAIL_BATCH_LIMIT = 100
+
+
+class EmailBackend(ABC):
+    """Async email backend. send() takes resend-style params and returns the provider response or None."""
+
+    @abstractmethod
+    async def send(self, params: dict) -> Optional[dict]:
+        ...
+
+    async def send_batch(self, params_list: List[dict]) -> List[Optional[dict]]:
+        """Send several emails; returns one provider response per email, in order."""
+        return list(await asyncio.gather(*(self.send(params) for params in params_list)))
+
+    async def aclose(self):
+        pass
+
+
+class ResendHttpBackend(EmailBackend):
+    """
+    Sends through the provider's HTTP API on one shared keep-alive client.
+
+    At most max_concurrency requests are in flight; further sends wait their turn
+    instead of opening more connections.
+    """
+
+    def __init__(self, base_url: str = EMAIL_API_URL, api_key: Optional[str] = None,
+                 max_concurrency: int = EMAIL_MAX_CONCURRENCY):
+        self.base_url = base_url
+        self.api_key = api_key or os.getenv("RESEND_API_KEY")
+        self.max_concurrency = max(max_concurrency, 1)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                timeout=httpx.Timeout(EMAIL_TIMEOUT_SECONDS, connect=EMAIL_CONNECT_TIMEOUT_SECONDS),
+                limits=httpx.Limits(max_connections=self.max_concurrency,
+                                    max_keepalive_connections=self.max_concurrency),
+            )
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    async def post(self, path: str, payload) -> Optional[dict]:
+        client = self._get_client()
+        async with self._slots:
+            with track_dependency("resend", f"POST {path}"):
+                response = await client.post(path, json=payload)
+                response.raise_for_status()
+        return response.json()
+
+    async def send(self, params: dict) -> Optional[dict]:
+        return await self.post("/emails", params)
+
+    async def send_batch(self, params_list: List[dict]) -> List[Optional[dict]]:
+        # the batch endpoint takes up to EMAIL_BATCH_LIMIT emails per request
+        results = []
+        for start in range(0, len(params_list), EMAIL_BATCH_LIMIT):
+            response = await self.post("/emails/batch", params_list[start:start + EMAIL_BATCH_LIMIT])
+            results.extend(response.get("data", []))
+        return results
+
+    async def aclose(self):
+        if self._client is not None:
+            client = self._client
+            self._client = None
+            await client.aclose()
+
+
+class NullEmailBackend(EmailBackend):
+    """Accepts every email without sending it. For local runs and benchmarks."""
+
+    def __init__(self, **kwargs):
+        self.sent = 0
+        self._ids = itertools.count(1)
+
+    async def send(self, params: dict) -> Optional[dict]:
+        self.sent += 1
+        return {"id": f"null-{next(self._ids)}"}
+
+
+def is_recipient_rejection(error: Exception, destination: str = None) -> bool:
+    """
+    True if the provider refused the email because of its recipient (malformed or
+    undeliverable address). Other 422s, e.g. a bad from address or missing fields,
+    are the app's fault and say nothing about the recipient.
+    """
+    if not isinstance(error, httpx.HTTPStatusError) or error.response.status_code != 422:
+        return False
+    try:
+        message = str(error.response.json().get("message", ""))
+    except ValueError:
+        return False
+    return "`to`" in message or bool(destination and destination.lower() in message.lower())
+
+
+EMAIL_BACKENDS: Dict[str, Type[EmailBackend]] = {
+    "resend": ResendHttpBackend,
+    "null": NullEmailBackend,
+}
+
+_email_backend: Optional[EmailBackend] = None
+
+def get_email_backend() -> EmailBackend:
+    global _email_backend
+    if _email_backend is None:
+        if EMAIL_BACKEND not in EMAIL_BACKENDS:
+            raise ValueError(f"unknown EMAIL_BACKEND {EMAIL_BACKEND}, expected one of {', '.join(EMAIL_BACKENDS)}")
+        _email_backend = EMAIL_BACKENDS[EMAIL_BACKEND]()
+    return _email_backend
+
+def set_email_backend(backend: Optional[EmailBackend]):
+    """Swap the process-wide backend, e.g. for a benchmark. None falls back to EMAIL_BACKEND."""
+    global _email_backend
+    _email_backend = backend
+
+async def close_email_backend():
+    global _email_backend
+    if _email_backend is not None:
+        backend = _email_backend
+        _email_backend = None
+        await backend.aclose()
@@ -1,14 +1,19 @@
 import asyncio
 from contextlib import asynccontextmanager
-from datetime import datetime, timedelta, timezone
+from anyio import to_thread
 import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 import os
 
-from app.api.endpoints import auth_endpoint, checkin_response_endpoint, content_gen_endpoint, project_endpoint, subscription_endpoint
-from app.services.notify_service import fetch_checkins_and_notify
+from app.api.endpoints import auth_endpoint, checkin_response_endpoint, content_gen_endpoint, email_endpoint, metrics_endpoint, project_endpoint, subscription_endpoint
+from app.core.database import close_async_pool, create_async_pool
+from app.infra.email_suppression import suppression_list
+from app.infra.email_transport import close_email_backend
+from app.scheduler.runner import EMBEDDED_SCHEDULER_ENABLED, run_scheduler
+from app.services.outbox_service import EMAIL_OUTBOX_WORKER_ENABLED, run_outbox_worker
+from app.utils.password_hasher import password_hasher
 load_dotenv()
 
 logging.basicConfig(
@@ -18,28 +23,29 @@ logging.basicConfig(
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    async def runner():
-        # Sleep until the top of the next hour
-        now = datetime.now(timezone.utc)
-        next_hour = (now + timedelta(hours=1)).replace(minute=0, second=0, microsecond=0)
-        wait_seconds = (next_hour - now).total_seconds()
-        logging.info(f"Sleeping for {int(wait_seconds)}s to align to next hour at {next_hour.isoformat()} UTC")
-        await asyncio.sleep(wait_seconds)
-
-        # Then run every hour exactly on the hour
-        while True:
-            logging.info(f"Running check-in task at {datetime.now(timezone.utc).isoformat()} UTC")
-            await fetch_checkins_and_notify()
-            await asyncio.sleep(3600)  # wait for the next hour
-
-    task = asyncio.create_task(runner())
+    await create_async_pool()
+    await suppression_list.refresh(force=True)
+    # waiting bcrypt calls hold request threads, so they may only take a share of them
+    password_hasher.fit_threadpool(to_thread.current_default_thread_limiter().total_tokens)
+    # bcrypt cost for this host; off the loop since it hashes for a few hundred ms
+    await asyncio.get_running_loop().run_in_executor(None, password_hasher.calibrate)
+    task = asyncio.create_task(run_scheduler()) if EMBEDDED_SCHEDULER_ENABLED else None
+    outbox_task = asyncio.create_task(run_outbox_worker()) if EMAIL_OUTBOX_WORKER_ENABLED else None
     yield
     
-    task.cancel()
     try:
-        await task
-    except asyncio.CancelledError:
+        for background_task in (task, outbox_task):
+            if background_task:
+                background_task.cancel()
+                try:
+                    await background_task
+                except asyncio.CancelledError:
+                    pass
         logging.info("Background task cancelled during shutdown.")
+    finally:
+        await close_email_backend()
+        await close_async_pool()
+        password_hasher.shutdown()
 
 app = FastAPI(
     title=os.getenv("PROJECT_NAME"),
@@ -68,5 +74,7 @@ app.include_router(project_endpoint.router, prefix=os.getenv("API_V1_STR"))
 app.include_router(checkin_response_endpoint.router, prefix=os.getenv("API_V1_STR"))
 app.include_router(subscription_endpoint.router, prefix=os.getenv("API_V1_STR"))
 app.include_router(content_gen_endpoint.router, prefix=os.getenv("API_V1_STR"))
+app.include_router(email_endpoint.router, prefix=os.getenv("API_V1_STR"))
+app.include_router(metrics_endpoint.router)
 #handler = Mangum(app)
 
@@ -0,0 +1,47 @@
+from datetime import datetime, timezone
+from sqlalchemy import Column, DateTime, Index, Integer, String, func, text
+from sqlalchemy.dialects.postgresql import JSONB
+from app.core.database import Base
+
+
+class EmailOutboxModel(Base):
+    __tablename__ = "email_outbox"
+    # the worker only ever looks at pending rows that are due
+    __table_args__ = (
+        Index("ix_email_outbox_pending", "next_attempt_at", postgresql_where=text("status = 'PENDING'")),
+    )
+
+    id = Column(Integer, primary_key=True)
+    destination_email = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    template = Column(String, nullable=False)
+    context = Column(JSONB, nullable=False, default=dict)
+    # PENDING -> SENT, or FAILED once retries are exhausted, or SUPPRESSED
+    status = Column(String, nullable=False, default="PENDING")
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+    last_error = Column(String, nullable=True)
+    provider_message_id = Column(String, nullable=True)
+    date_created = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    date_sent = Column(DateTime(timezone=True), nullable=True)
+
+
+class EmailCooldownModel(Base):
+    __tablename__ = "email_cooldowns"
+
+    # one row per (destination, template key); the last time it was let through
+    destination_email = Column(String, primary_key=True)
+    template_key = Column(String, primary_key=True)
+    last_sent_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class EmailSuppressionModel(Base):
+    __tablename__ = "email_suppressions"
+
+    # lower-cased; nothing is sent to an address listed here
+    email = Column(String, primary_key=True)
+    # bounce, complaint or invalid (rejected by the provider on send)
+    reason = Column(String, nullable=False)
+    detail = Column(String, nullable=True)
+    # the database's clock; it is the cursor other processes refresh their copy from
+    date_created = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), index=True)
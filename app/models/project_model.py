@@ -1,5 +1,5 @@
 from datetime import datetime, timezone
-from sqlalchemy import ARRAY, Boolean, Column, DateTime, Integer, String, Time
+from sqlalchemy import ARRAY, Boolean, Column, DateTime, Index, Integer, String, Time, text
 from app.core.database import Base
 
 
@@ -17,6 +17,11 @@ class ProjectModel(Base):
     end_date = Column(DateTime, nullable=True)
     has_ended = Column(Boolean, default=False)
 
+    __table_args__ = (
+        # lets the end-date sweeper find expired projects without scanning finished ones
+        Index("ix_projects_end_date_live", "end_date", postgresql_where=text("has_ended = false")),
+    )
+
 class CheckinModel(Base):
     __tablename__ = "checkins"
 
@@ -32,6 +37,13 @@ class CheckinModel(Base):
     last_run_time_utc = Column(Time, nullable=True)
     project_ended = Column(Boolean, default=False)
     checkin_days_utc = Column(ARRAY(String))
+    next_fire_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # dispatch only ever range-scans live checkins
+        Index("ix_checkins_next_fire_at_live", "next_fire_at",
+              postgresql_where=text("is_active = true AND project_ended = false")),
+    )
 
 
 class ProjectMemberModel(Base):
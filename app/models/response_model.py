@@ -1,7 +1,7 @@
 
 
 from datetime import datetime, timezone
-from sqlalchemy import  Boolean, Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy import  Boolean, Column, Date, DateTime, ForeignKey, Index, Integer, String, cast
 from sqlalchemy.dialects.postgresql import ARRAY
 
 from app.core.database import Base
@@ -43,6 +43,13 @@ class CheckInResponseTracker(Base):
     checkin_id = Column(Integer)
     date_created=Column(DateTime)
     from_server_name = Column(String, nullable=True)
+    reminder_sent_at = Column(DateTime, nullable=True)
+
+# one tracker per checkin per user-local day; dispatch relies on it for INSERT ... ON CONFLICT
+Index("uq_checkin_response_tracker_checkin_day",
+      CheckInResponseTracker.checkin_id,
+      cast(CheckInResponseTracker.user_checkin_date, Date),
+      unique=True)
 
 class CheckInAnalyticsModel(Base):
     __tablename__ = "checkin_analytics"
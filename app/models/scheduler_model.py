@@ -0,0 +1,12 @@
+from datetime import datetime, timezone
+from sqlalchemy import Column, DateTime, String
+from app.core.database import Base
+
+
+class DispatchLedgerModel(Base):
+    __tablename__ = "dispatch_ledger"
+
+    # "checkins" or "checkins:<shard>" for a sharded dispatcher
+    name = Column(String, primary_key=True)
+    last_completed_at = Column(DateTime(timezone=True), nullable=False)
+    date_updated = Column(DateTime, default=datetime.now(timezone.utc))
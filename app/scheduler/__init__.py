@@ -0,0 +1,6 @@
+from app.scheduler.timing_wheel import TimingWheel
+
+# upcoming check-ins of this process, keyed by checkin id
+checkin_wheel = TimingWheel()
+
+__all__ = ["TimingWheel", "checkin_wheel"]
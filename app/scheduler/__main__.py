@@ -0,0 +1,38 @@
+import argparse
+import asyncio
+import logging
+import signal
+
+from app.core.database import close_async_pool, create_async_pool
+from app.infra.email_transport import close_email_backend
+from app.scheduler.runner import Shard, run_scheduler
+
+logging.basicConfig(
+    format="%(asctime)s [%(process)d] [%(levelname)s] %(message)s",
+    level=logging.INFO
+)
+
+
+async def main(shard: Shard = None):
+    await create_async_pool()
+    task = asyncio.create_task(run_scheduler(shard))
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, task.cancel)
+
+    logging.info(f"Check-in dispatcher started for shard {shard or 'all'}")
+    try:
+        await task
+    except asyncio.CancelledError:
+        logging.info("Check-in dispatcher stopped.")
+    finally:
+        await close_email_backend()
+        await close_async_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m app.scheduler", description="Run check-in dispatch outside the web process.")
+    parser.add_argument("--shard", type=Shard.parse, default=None,
+                        help="dispatch only the checkins of shard N of COUNT, e.g. 2/8")
+    args = parser.parse_args()
+    asyncio.run(main(args.shard))
@@ -0,0 +1,83 @@
+import logging
+import os
+from typing import Optional
+
+import asyncpg
+from dotenv import load_dotenv
+
+from app.core.database import SQLALCHEMY_DATABASE_URL
+
+load_dotenv()
+
+logging.basicConfig(
+    format="%(asctime)s [%(process)d] [%(levelname)s] %(message)s",
+    level=logging.INFO
+)
+
+SCHEDULER_LOCK_KEY = int(os.getenv("SCHEDULER_LOCK_KEY", "727001"))
+
+
+class LeaderElection:
+    """
+    Cluster-wide leader election on a Postgres session advisory lock.
+
+    The lock is held on a dedicated connection outside the pool, so it lives exactly
+    as long as this process's connection: if the leader dies or loses its connection
+    Postgres releases the lock and the next process to call ensure() takes over.
+    """
+
+    def __init__(self, lock_key: int = SCHEDULER_LOCK_KEY):
+        self.lock_key = lock_key
+        self._conn: Optional[asyncpg.Connection] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._conn is not None and not self._conn.is_closed()
+
+    async def ensure(self) -> bool:
+        """Confirm leadership is still held, or try to take it. Returns True when leader."""
+        if self._conn is not None:
+            try:
+                await self._conn.fetchval("SELECT 1")
+                return True
+            except Exception as e:
+                logging.error("scheduler leader connection lost, lock_key: %s ex: %s", self.lock_key, e)
+                await self._close()
+
+        conn = None
+        try:
+            conn = await asyncpg.connect(SQLALCHEMY_DATABASE_URL)
+            acquired = await conn.fetchval("SELECT pg_try_advisory_lock($1)", self.lock_key)
+        except Exception as e:
+            logging.error("scheduler leader election failed with ex: %s", e)
+            if conn is not None:
+                await conn.close()
+            return False
+
+        if not acquired:
+            await conn.close()
+            return False
+
+        self._conn = conn
+        logging.info(f'-- became scheduler leader for lock_key: {self.lock_key}')
+        return True
+
+    async def listen(self, channel: str, callback):
+        """LISTEN on the leader's connection, so the subscription lasts exactly as long as leadership."""
+        await self._conn.add_listener(channel, callback)
+
+    async def release(self):
+        if self._conn is not None and not self._conn.is_closed():
+            try:
+                await self._conn.execute("SELECT pg_advisory_unlock($1)", self.lock_key)
+            except Exception as e:
+                logging.error("scheduler leader unlock failed with ex: %s", e)
+        await self._close()
+
+    async def _close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            try:
+                await conn.close()
+            except Exception:
+                conn.terminate()
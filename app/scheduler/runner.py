@@ -0,0 +1,221 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+import logging
+import os
+from typing import NamedTuple, Optional
+
+from dotenv import load_dotenv
+
+from app.infra.email_suppression import suppression_list
+from app.scheduler import checkin_wheel
+from app.scheduler.leader import SCHEDULER_LOCK_KEY, LeaderElection
+from app.scheduler.schedule_events import CHECKIN_SCHEDULE_CHANNEL
+from app.services.notify_service import backfill_next_fire_at, catch_up_missed_windows, fetch_checkin_schedules, fetch_checkins_and_notify, prerender_checkins, record_dispatch_window, send_creator_digests, send_due_reminders, sweep_ended_projects
+
+load_dotenv()
+
+logging.basicConfig(
+    format="%(asctime)s [%(process)d] [%(levelname)s] %(message)s",
+    level=logging.INFO
+)
+
+# how often the wheel is reconciled with the table; changes made through the API
+# reach it on the next tick through CHECKIN_SCHEDULE_CHANNEL notifications
+WHEEL_RESYNC_MINUTES = int(os.getenv("WHEEL_RESYNC_MINUTES", "5"))
+# check-in emails are rendered this far ahead of their fire time; 0 disables
+PRERENDER_LOOKAHEAD_MINUTES = int(os.getenv("PRERENDER_LOOKAHEAD_MINUTES", "5"))
+# how often projects past their end_date are retired from dispatch
+END_DATE_SWEEP_MINUTES = int(os.getenv("END_DATE_SWEEP_MINUTES", "60"))
+END_DATE_SWEEP_BATCH_SIZE = int(os.getenv("END_DATE_SWEEP_BATCH_SIZE", "500"))
+# members who haven't responded this long after dispatch get one reminder; 0 disables
+REMINDER_DELAY_HOURS = float(os.getenv("REMINDER_DELAY_HOURS", "3"))
+REMINDER_SWEEP_MINUTES = int(os.getenv("REMINDER_SWEEP_MINUTES", "15"))
+# hour (UTC) at which creators get their daily check-in digest; -1 disables
+CREATOR_DIGEST_HOUR_UTC = int(os.getenv("CREATOR_DIGEST_HOUR_UTC", "18"))
+# on startup, windows missed further back than this are skipped rather than replayed
+DISPATCH_CATCHUP_LOOKBACK_HOURS = float(os.getenv("DISPATCH_CATCHUP_LOOKBACK_HOURS", "6"))
+# web workers can leave dispatch to standalone `python -m app.scheduler` processes
+EMBEDDED_SCHEDULER_ENABLED = os.getenv("EMBEDDED_SCHEDULER_ENABLED", "true").lower() in ("1", "true", "yes")
+
+
+class Shard(NamedTuple):
+    """The checkins whose id % count == index. Written 1-based on the command line: 2/8."""
+    index: int
+    count: int
+
+    @classmethod
+    def parse(cls, value: str) -> "Shard":
+        number, count = (int(part) for part in value.split("/"))
+        if count < 1 or not 1 <= number <= count:
+            raise ValueError(f"invalid shard {value}, expected N/COUNT with 1 <= N <= COUNT")
+        return cls(index=number - 1, count=count)
+
+    @property
+    def ledger_name(self) -> str:
+        return f"checkins:{self}"
+
+    @property
+    def lock_key(self) -> int:
+        return SCHEDULER_LOCK_KEY * 1_000_000 + self.count * 1000 + self.index
+
+    def __str__(self) -> str:
+        return f"{self.index + 1}/{self.count}"
+
+
+class CheckinWheelLoader:
+    """Keeps checkin_wheel in sync with the checkins table, off the dispatch path."""
+
+    def __init__(self, shard: Optional[Shard] = None):
+        self.shard = shard
+        self.max_id = 0
+        self.last_sync = None
+        # checkins other processes reported as changed since the last tick
+        self._changed = set()
+
+    def on_schedule_changed(self, conn, pid, channel, payload):
+        try:
+            checkin_id = int(payload)
+        except ValueError:
+            logging.error(f"ignoring {channel} notification with payload {payload!r}")
+            return
+        if self.shard is None or checkin_id % self.shard.count == self.shard.index:
+            self._changed.add(checkin_id)
+
+    async def apply_changes(self):
+        """Reload the schedules of checkins changed since the last tick, before it dispatches."""
+        if not self._changed:
+            return
+        checkin_ids, self._changed = list(self._changed), set()
+        try:
+            self._schedule(await fetch_checkin_schedules(checkin_ids=checkin_ids))
+        except Exception as e:
+            logging.error("timing wheel apply_changes failed with ex: %s", e)
+            self._changed.update(checkin_ids)
+
+    async def sync(self):
+        started = datetime.now(timezone.utc)
+        # date_updated is naive; a day of overlap absorbs any session timezone skew
+        updated_since = (self.last_sync - timedelta(days=1)).replace(tzinfo=None) if self.last_sync else None
+        rows = await fetch_checkin_schedules(self.max_id, updated_since, self.shard)
+        self._schedule(rows)
+        if rows:
+            self.max_id = max(self.max_id, max(row['id'] for row in rows))
+        self.last_sync = started
+        logging.info(f'-- timing wheel synced {len(rows)} checkins, {len(checkin_wheel)} scheduled')
+
+    async def restore(self, checkin_ids: list, retry_at: datetime):
+        """
+        Put checkins popped by a failed dispatch back at their stored next_fire_at, so
+        the ones still due are retried on the next tick. Dispatch doesn't touch
+        date_updated, so sync() would never bring them back. If the database can't be
+        read either, they are all retried at retry_at.
+        """
+        try:
+            self._schedule(await fetch_checkin_schedules(checkin_ids=checkin_ids))
+        except Exception as e:
+            logging.error("timing wheel restore failed with ex: %s", e)
+            checkin_wheel.schedule_many((checkin_id, retry_at) for checkin_id in checkin_ids)
+
+    def _schedule(self, rows):
+        checkin_wheel.schedule_many(
+            (row['id'], row['next_fire_at'] if row['is_active'] and not row['project_ended'] else None)
+            for row in rows
+        )
+
+
+async def run_scheduler(shard: Optional[Shard] = None):
+    # every worker runs this loop, but only the advisory-lock holder dispatches
+    leader = LeaderElection(shard.lock_key if shard else SCHEDULER_LOCK_KEY)
+    ledger_name = shard.ledger_name if shard else "checkins"
+    loader = None
+    next_sync = None
+    prerendered_until = None
+    next_sweep = None
+    next_reminders = None
+    digest_date = None
+    # first tick whose check-ins haven't been sent yet; the ledger is held back until they are
+    failed_since = None
+    # the sweep and reminders are cluster-wide, so only one shard runs them
+    runs_cluster_jobs = shard is None or shard.index == 0
+
+    try:
+        # Tick on every minute boundary. Each sleep targets an absolute boundary,
+        # so a slow dispatch never pushes later ticks out.
+        while True:
+            now = datetime.now(timezone.utc)
+            next_tick = now.replace(second=0, microsecond=0) + timedelta(minutes=1)
+            await asyncio.sleep((next_tick - now).total_seconds())
+
+            tick = max(datetime.now(timezone.utc), next_tick)
+            if not await leader.ensure():
+                loader = None
+                failed_since = None
+                continue
+
+            if loader is None:
+                # newly elected: the wheel may be stale, rebuild it from the database
+                await backfill_next_fire_at(tick, shard)
+                await catch_up_missed_windows(ledger_name, tick, timedelta(hours=DISPATCH_CATCHUP_LOOKBACK_HOURS), shard)
+                checkin_wheel.clear(tick)
+                try:
+                    loader = CheckinWheelLoader(shard)
+                    # listen first, so nothing changed while the wheel loads is missed
+                    await leader.listen(CHECKIN_SCHEDULE_CHANNEL, loader.on_schedule_changed)
+                    await loader.sync()
+                except Exception as e:
+                    logging.error("timing wheel load failed with ex: %s", e)
+                    loader = None
+                    continue
+                next_sync = tick + timedelta(minutes=WHEEL_RESYNC_MINUTES)
+                prerendered_until = tick
+                next_sweep = tick
+                next_reminders = tick
+
+            if runs_cluster_jobs and tick >= next_sweep:
+                for checkin_id in await sweep_ended_projects(tick, END_DATE_SWEEP_BATCH_SIZE):
+                    checkin_wheel.cancel(checkin_id)
+                next_sweep = tick + timedelta(minutes=END_DATE_SWEEP_MINUTES)
+
+            await suppression_list.refresh()
+            await loader.apply_changes()
+            due = checkin_wheel.advance(tick)
+            if due:
+                logging.info(f"Running check-in task for {len(due)} checkins at {tick.isoformat()} UTC")
+                rescheduled = await fetch_checkins_and_notify(tick, due, shard)
+                if rescheduled is not None:
+                    checkin_wheel.schedule_many(rescheduled)
+                    # the failed window's check-ins were restored into this tick's due set
+                    failed_since = None
+                else:
+                    await loader.restore(due, tick)
+                    failed_since = failed_since or tick
+            if failed_since is None:
+                await record_dispatch_window(ledger_name, tick)
+            else:
+                # a new leader's catch-up starts from the ledger, so it replays from here
+                logging.warning(f"-- dispatch incomplete since {failed_since.isoformat()}, ledger held back")
+
+            # after sending, get the next few minutes ready so their fire time is send-only
+            if PRERENDER_LOOKAHEAD_MINUTES > 0:
+                window_end = tick + timedelta(minutes=PRERENDER_LOOKAHEAD_MINUTES)
+                await prerender_checkins(max(prerendered_until, tick), window_end, shard)
+                prerendered_until = window_end
+
+            if runs_cluster_jobs and REMINDER_DELAY_HOURS > 0 and tick >= next_reminders:
+                await send_due_reminders(tick, timedelta(hours=REMINDER_DELAY_HOURS))
+                next_reminders = tick + timedelta(minutes=REMINDER_SWEEP_MINUTES)
+
+            # any tick in the digest hour will do; the ledger inside keeps it to once a
+            # day even across leader changes
+            if runs_cluster_jobs and tick.hour == CREATOR_DIGEST_HOUR_UTC and digest_date != tick.date():
+                await send_creator_digests(tick)
+                digest_date = tick.date()
+
+            if tick >= next_sync:
+                try:
+                    await loader.sync()
+                except Exception as e:
+                    logging.error("timing wheel sync failed with ex: %s", e)
+                next_sync = tick + timedelta(minutes=WHEEL_RESYNC_MINUTES)
+    finally:
+        await leader.release()
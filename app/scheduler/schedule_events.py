@@ -0,0 +1,14 @@
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# payload is the checkin id; the scheduler leader reloads that checkin's schedule
+CHECKIN_SCHEDULE_CHANNEL = "checkin_schedule"
+
+
+def notify_checkin_changed(db: Session, checkin_id: int):
+    """
+    Tell the scheduler leader a checkin's schedule changed. Call it before db.commit():
+    Postgres delivers the notification on commit, and drops it on rollback.
+    """
+    db.execute(text("SELECT pg_notify(:channel, :payload)"),
+               {"channel": CHECKIN_SCHEDULE_CHANNEL, "payload": str(checkin_id)})
@@ -0,0 +1,179 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+import logging
+import os
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from app.utils.metrics import prometheus_metric
+
+load_dotenv()
+
+logging.basicConfig(
+    format="%(asctime)s [%(process)d] [%(levelname)s] %(message)s",
+    level=logging.INFO
+)
+
+# 0 keeps the old behaviour of sending every email inline at fire time
+DISPATCH_SEND_BUDGET_PER_MINUTE = int(os.getenv("DISPATCH_SEND_BUDGET_PER_MINUTE", "0"))
+# every email goes out within this many minutes of its nominal time, even over budget
+DISPATCH_SMOOTHING_WINDOW_MINUTES = int(os.getenv("DISPATCH_SMOOTHING_WINDOW_MINUTES", "15"))
+# paid-plan emails get their own lane so a large free fan-out never delays them
+DISPATCH_PAID_SEND_BUDGET_PER_MINUTE = int(os.getenv("DISPATCH_PAID_SEND_BUDGET_PER_MINUTE", str(DISPATCH_SEND_BUDGET_PER_MINUTE)))
+DISPATCH_PAID_SMOOTHING_WINDOW_MINUTES = int(os.getenv("DISPATCH_PAID_SMOOTHING_WINDOW_MINUTES", "1"))
+# unpaced sends each lane may have in flight with the provider at once; together they
+# should stay within EMAIL_MAX_CONCURRENCY so a full free lane leaves paid sends a slot
+DISPATCH_PAID_CONCURRENCY = int(os.getenv("DISPATCH_PAID_CONCURRENCY", "4"))
+DISPATCH_FREE_CONCURRENCY = int(os.getenv("DISPATCH_FREE_CONCURRENCY", "16"))
+
+TIER_PAID = "paid"
+TIER_FREE = "free"
+
+
+def tier_for_plan(plan_id: Optional[int]) -> str:
+    # plan 0 (or no active subscription) is the free plan
+    return TIER_PAID if plan_id else TIER_FREE
+
+
+class DispatchQueue:
+    """
+    Paces outbound check-in emails at a per-minute send budget, or sends them inline.
+
+    Nothing is held in memory: slots() hands out a send time per email, and the
+    caller writes the emails to the durable email_outbox with those times, in the
+    same transaction that claims them. The outbox worker sends each one once its
+    time comes, so a restart or a leader change never drops a paced email.
+
+    Send times are spaced at the budgeted rate, oldest first and never before the
+    nominal (scheduled) time. When a backlog could not clear inside the smoothing
+    window at that rate, the rate is raised just enough to meet it.
+
+    Without a budget, submit() sends in the background with at most concurrency
+    sends in flight, so the dispatch tick never waits for the provider and one
+    lane's backlog never holds up another's.
+    """
+
+    def __init__(self, budget_per_minute: int = DISPATCH_SEND_BUDGET_PER_MINUTE,
+                 window_minutes: int = DISPATCH_SMOOTHING_WINDOW_MINUTES, concurrency: int = 1):
+        self.budget_per_minute = budget_per_minute
+        self.window_minutes = window_minutes
+        self.concurrency = max(concurrency, 1)
+        self.scheduled = 0
+        self.sent = 0
+        self.failed = 0
+        # the first free send time; a new leader starts over from the nominal time
+        self._next_slot: Optional[datetime] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._in_flight = set()
+        self._sending = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.budget_per_minute > 0
+
+    @property
+    def in_flight(self) -> int:
+        return self._sending
+
+    @property
+    def waiting(self) -> int:
+        return len(self._in_flight) - self._sending
+
+    def stats(self) -> dict:
+        return {
+            "scheduled": self.scheduled,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "sent": self.sent,
+            "failed": self.failed,
+            "budget_per_minute": self.budget_per_minute,
+        }
+
+    def submit(self, send: Callable[[], Awaitable]):
+        """Send in the background, once one of this lane's concurrency slots is free."""
+        if self._slots is None:
+            # created on first use so it belongs to the running loop
+            self._slots = asyncio.Semaphore(self.concurrency)
+        task = asyncio.create_task(self._send(send))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def drain(self):
+        """Wait for every send submitted so far."""
+        while self._in_flight:
+            await asyncio.gather(*self._in_flight)
+
+    async def _send(self, send: Callable[[], Awaitable]):
+        async with self._slots:
+            self._sending += 1
+            try:
+                await send()
+                self.sent += 1
+            except Exception as e:
+                self.failed += 1
+                logging.error("dispatch queue send failed with ex: %s", e)
+            finally:
+                self._sending -= 1
+
+    def slots(self, nominal_at: datetime, count: int, now: Optional[datetime] = None) -> List[datetime]:
+        """Send times for count emails due at nominal_at, after everything paced before them."""
+        if count <= 0:
+            return []
+        start = max(nominal_at, now or datetime.now(timezone.utc), self._next_slot or nominal_at)
+        interval = 60.0 / self.budget_per_minute
+        if self.window_minutes > 0:
+            seconds_left = (nominal_at + timedelta(minutes=self.window_minutes) - start).total_seconds()
+            interval = min(interval, max(seconds_left, 1.0) / count)
+        slots = [start + timedelta(seconds=interval * i) for i in range(count)]
+        self._next_slot = start + timedelta(seconds=interval * count)
+        self.scheduled += count
+        return slots
+
+
+class TieredDispatchQueue:
+    """
+    One DispatchQueue lane per plan tier, each with its own send budget and concurrency.
+
+    The lanes are paced and sent independently, so paid-plan emails go out at their
+    own pace however deep the free lane is.
+    """
+
+    def __init__(self, lanes: Dict[str, DispatchQueue], default_tier: str = TIER_FREE):
+        self.lanes = lanes
+        self.default_tier = default_tier
+
+    @property
+    def configured(self) -> bool:
+        return any(lane.enabled for lane in self.lanes.values())
+
+    def lane(self, tier: Optional[str] = None) -> DispatchQueue:
+        return self.lanes.get(tier or self.default_tier, self.lanes[self.default_tier])
+
+    async def drain(self):
+        await asyncio.gather(*(lane.drain() for lane in self.lanes.values()))
+
+    def stats(self) -> dict:
+        return {tier: lane.stats() for tier, lane in self.lanes.items()}
+
+    def render_prometheus(self) -> str:
+        stats = self.stats()
+        return "".join(
+            prometheus_metric(f"dispatch_queue_{name}", kind, help,
+                              (({"tier": tier}, lane[key]) for tier, lane in sorted(stats.items())))
+            for name, key, kind, help in (
+                ("scheduled_total", "scheduled", "counter", "Paced check-in emails written to the outbox."),
+                ("in_flight", "in_flight", "gauge", "Unpaced check-in emails being sent by this process."),
+                ("waiting", "waiting", "gauge", "Unpaced check-in emails waiting for a send slot in this process."),
+                ("sent_total", "sent", "counter", "Unpaced check-in emails sent."),
+                ("failed_total", "failed", "counter", "Unpaced check-in emails whose send raised."),
+            )
+        )
+
+
+dispatch_queue = TieredDispatchQueue({
+    TIER_PAID: DispatchQueue(DISPATCH_PAID_SEND_BUDGET_PER_MINUTE, DISPATCH_PAID_SMOOTHING_WINDOW_MINUTES,
+                             DISPATCH_PAID_CONCURRENCY),
+    TIER_FREE: DispatchQueue(DISPATCH_SEND_BUDGET_PER_MINUTE, DISPATCH_SMOOTHING_WINDOW_MINUTES,
+                             DISPATCH_FREE_CONCURRENCY),
+})
@@ -0,0 +1,147 @@
+from datetime import datetime, timezone
+import math
+import threading
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+MINUTE_SLOTS = 60
+HOUR_SLOTS = 24
+DAY_SLOTS = 8  # check-ins repeat weekly, so a week plus a day covers every schedule
+
+_LEVEL_MINUTE = 0
+_LEVEL_HOUR = 1
+_LEVEL_DAY = 2
+_LEVEL_OVERFLOW = 3
+
+
+def _to_minute(dt: datetime) -> int:
+    # round up so an entry never fires before its instant
+    return math.ceil(dt.timestamp() / 60)
+
+
+class TimingWheel:
+    """
+    Hierarchical timing wheel with minute resolution.
+
+    Entries live in a minute, hour or day wheel depending on how far out they are
+    and cascade down as the cursor reaches their hour/day, so advancing costs
+    O(due entries) rather than a scan of everything scheduled.
+    Safe to call from request threads and the scheduler loop concurrently.
+    """
+
+    def __init__(self, now: Optional[datetime] = None):
+        self._lock = threading.Lock()
+        self._cursor = math.floor((now or datetime.now(timezone.utc)).timestamp() / 60)
+        self._minutes: List[Set[Hashable]] = [set() for _ in range(MINUTE_SLOTS)]
+        self._hours: List[Set[Hashable]] = [set() for _ in range(HOUR_SLOTS)]
+        self._days: List[Set[Hashable]] = [set() for _ in range(DAY_SLOTS)]
+        self._overflow: Set[Hashable] = set()
+        self._due: Set[Hashable] = set()
+        # key -> (fire minute, level, slot)
+        self._entries: Dict[Hashable, Tuple[int, int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def schedule(self, key: Hashable, fire_at: Optional[datetime]):
+        """Add or move an entry. A fire_at of None removes it."""
+        with self._lock:
+            self._remove(key)
+            if fire_at is not None:
+                self._place(key, _to_minute(fire_at))
+
+    def schedule_many(self, items: Iterable[Tuple[Hashable, Optional[datetime]]]):
+        with self._lock:
+            for key, fire_at in items:
+                self._remove(key)
+                if fire_at is not None:
+                    self._place(key, _to_minute(fire_at))
+
+    def cancel(self, key: Hashable):
+        with self._lock:
+            self._remove(key)
+
+    def clear(self, now: Optional[datetime] = None):
+        """Drop every entry and restart the cursor at now."""
+        with self._lock:
+            self._cursor = math.floor((now or datetime.now(timezone.utc)).timestamp() / 60)
+            for slots in (self._minutes, self._hours, self._days):
+                for slot in slots:
+                    slot.clear()
+            self._overflow.clear()
+            self._due.clear()
+            self._entries.clear()
+
+    def advance(self, now: datetime) -> List[Hashable]:
+        """Move the cursor up to now and return (and remove) every entry that is due."""
+        target = math.floor(now.timestamp() / 60)
+        with self._lock:
+            fired = list(self._due)
+            self._due.clear()
+            while self._cursor < target:
+                self._cursor += 1
+                if self._cursor % (MINUTE_SLOTS * HOUR_SLOTS) == 0:
+                    self._cascade_day()
+                if self._cursor % MINUTE_SLOTS == 0:
+                    self._cascade(self._hours[(self._cursor // MINUTE_SLOTS) % HOUR_SLOTS])
+                slot = self._minutes[self._cursor % MINUTE_SLOTS]
+                fired.extend(slot)
+                slot.clear()
+            # entries cascaded onto the cursor minute land in _due
+            fired.extend(self._due)
+            self._due.clear()
+            for key in fired:
+                self._entries.pop(key, None)
+            return fired
+
+    def _place(self, key: Hashable, minute: int):
+        delta = minute - self._cursor
+        if delta <= 0:
+            level, slot, bucket = _LEVEL_MINUTE, -1, self._due
+        elif delta < MINUTE_SLOTS:
+            slot = minute % MINUTE_SLOTS
+            level, bucket = _LEVEL_MINUTE, self._minutes[slot]
+        else:
+            hour = minute // MINUTE_SLOTS
+            hour_delta = hour - self._cursor // MINUTE_SLOTS
+            day = hour // HOUR_SLOTS
+            day_delta = day - self._cursor // (MINUTE_SLOTS * HOUR_SLOTS)
+            # a slot is only reused once the cursor has passed it, so an entry may
+            # sit in a wheel as long as it is less than one full turn ahead
+            if hour_delta < HOUR_SLOTS:
+                slot = hour % HOUR_SLOTS
+                level, bucket = _LEVEL_HOUR, self._hours[slot]
+            elif day_delta < DAY_SLOTS:
+                slot = day % DAY_SLOTS
+                level, bucket = _LEVEL_DAY, self._days[slot]
+            else:
+                level, slot, bucket = _LEVEL_OVERFLOW, -1, self._overflow
+        bucket.add(key)
+        self._entries[key] = (minute, level, slot)
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        _, level, slot = entry
+        if slot == -1:
+            (self._due if level == _LEVEL_MINUTE else self._overflow).discard(key)
+        elif level == _LEVEL_MINUTE:
+            self._minutes[slot].discard(key)
+        elif level == _LEVEL_HOUR:
+            self._hours[slot].discard(key)
+        else:
+            self._days[slot].discard(key)
+
+    def _cascade(self, bucket: Set[Hashable]):
+        keys = list(bucket)
+        bucket.clear()
+        for key in keys:
+            minute = self._entries.pop(key)[0]
+            self._place(key, minute)
+
+    def _cascade_day(self):
+        self._cascade(self._days[(self._cursor // (MINUTE_SLOTS * HOUR_SLOTS)) % DAY_SLOTS])
+        self._cascade(self._overflow)
@@ -4,6 +4,7 @@ from typing import List
 
 from dotenv import load_dotenv
 from app.schemas.checkin_response_schema import CheckInAnalyticsRequest
+from app.utils.metrics import track_dependency
 from google import genai
 load_dotenv()
 
@@ -46,9 +47,10 @@ class AiService:
             }}
         """
 
-        response = self.client.models.generate_content(
-            model='gemini-2.0-flash-001', contents=prompt
-        )
+        with track_dependency("gemini", "process_response"):
+            response = self.client.models.generate_content(
+                model='gemini-2.0-flash-001', contents=prompt
+            )
         # Handle output formatting
         json_str = response.text.strip().replace("```json", "").replace("```", "")
         json_obj = json.loads(json_str)
@@ -85,9 +87,10 @@ class AiService:
 
         #print(prompt)
 
-        response = self.client.models.generate_content(
-            model='gemini-2.0-flash-001', contents=prompt
-        )
+        with track_dependency("gemini", "generate_content"):
+            response = self.client.models.generate_content(
+                model='gemini-2.0-flash-001', contents=prompt
+            )
         
         # Handle output formatting
         json_str = response.text.strip().replace("```json", "").replace("```", "")
@@ -0,0 +1,112 @@
+import base64
+from contextlib import contextmanager
+import hashlib
+import hmac
+import json
+import logging
+import os
+import time
+
+from dotenv import load_dotenv
+from fastapi import status
+
+from app.core.database import SessionLocal
+from app.infra.email_suppression import suppression_list
+from app.schemas.response_schema import BaseResponse
+
+load_dotenv()
+
+logging.basicConfig(
+    format="%(asctime)s [%(process)d] [%(levelname)s] %(message)s",
+    level=logging.INFO
+)
+
+# signing secret of the provider's webhook (whsec_...); unsigned webhooks are refused without it
+RESEND_WEBHOOK_SECRET = os.getenv("RESEND_WEBHOOK_SECRET")
+WEBHOOK_TOLERANCE_SECONDS = 300
+
+SUPPRESSING_EVENTS = {
+    "email.bounced": "bounce",
+    "email.complained": "complaint",
+}
+
+
+class EmailService:
+    def __init__(self):
+        self.db = SessionLocal()
+
+    def __del__(self):
+        self.db.close()
+
+    @contextmanager
+    def get_session(self):
+        try:
+            yield self.db
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        finally:
+            self.db.close()
+
+    def verify_webhook_signature(self, headers, body: bytes) -> bool:
+        """Check the svix-style signature the provider sends with every webhook."""
+        if not RESEND_WEBHOOK_SECRET:
+            return False
+        message_id = headers.get("svix-id")
+        timestamp = headers.get("svix-timestamp")
+        signatures = headers.get("svix-signature", "")
+        if not message_id or not timestamp or not timestamp.isdigit():
+            return False
+        if abs(time.time() - int(timestamp)) > WEBHOOK_TOLERANCE_SECONDS:
+            return False
+
+        secret = base64.b64decode(RESEND_WEBHOOK_SECRET.removeprefix("whsec_"))
+        signed = f"{message_id}.{timestamp}.".encode() + body
+        expected = base64.b64encode(hmac.new(secret, signed, hashlib.sha256).digest()).decode()
+        return any(hmac.compare_digest(expected, signature.partition(",")[2])
+                   for signature in signatures.split())
+
+    def handle_provider_webhook(self, headers, body: bytes) -> BaseResponse[str]:
+        try:
+            if not self.verify_webhook_signature(headers, body):
+                return BaseResponse(
+                    statusCode=status.HTTP_401_UNAUTHORIZED,
+                    message="Invalid webhook signature",
+                    data=None
+                )
+
+            payload = json.loads(body)
+            event = payload.get("type")
+            reason = SUPPRESSING_EVENTS.get(event)
+            data = payload.get("data", {})
+            # transient bounces (full mailbox, greylisting) are worth retrying later
+            if reason == "bounce" and data.get("bounce", {}).get("type", "Permanent") != "Permanent":
+                reason = None
+            if not reason:
+                return BaseResponse(
+                    statusCode=status.HTTP_200_OK,
+                    message="Event ignored",
+                    data=None
+                )
+
+            recipients = data.get("to") or []
+            if isinstance(recipients, str):
+                recipients = [recipients]
+            with self.get_session() as db:
+                for email in recipients:
+                    suppression_list.suppress(db, email, reason, json.dumps(data.get("bounce") or {})[:500])
+
+            logging.info(f"-- suppressed {len(recipients)} addresses after {event}")
+            return BaseResponse(
+                statusCode=status.HTTP_200_OK,
+                message="Addresses suppressed",
+                data=None
+            )
+        except Exception as e:
+            logging.error("handle_provider_webhook failed with ex: %s", e)
+            return BaseResponse(
+                statusCode=status.HTTP_400_BAD_REQUEST,
+                message="Error while processing webhook",
+                data=None
+            )
@@ -1,4 +1,5 @@
 from datetime import datetime, timedelta, timezone
+from functools import partial
 import json
 import logging
 
@@ -6,10 +7,13 @@ from pydantic import Json
 from app.infra.email_infra import EmailInfra
 import os 
 from dotenv import load_dotenv
-import asyncpg
 import socket
 
-from app.utils.security import encrypt_payload
+from app.core.database import get_async_pool
+from app.scheduler.send_queue import TIER_FREE, TIER_PAID, dispatch_queue, tier_for_plan
+
+from app.utils.helpers import compute_next_fire_at, convert_datetime_to_timezone
+from app.utils.security import encrypt_payload, encrypt_payloads
 load_dotenv()
 
 logging.basicConfig(
@@ -17,90 +21,649 @@ logging.basicConfig(
     level=logging.INFO
 )
 
-DATABASE_URL = os.getenv("DATABASE_URL")
 FRONTEND_URL = os.getenv('FRONTEND_URL')
+# send people in several projects due in the same run one email with a link per project
+GROUP_CHECKIN_EMAILS = os.getenv("GROUP_CHECKIN_EMAILS", "false").lower() in ("1", "true", "yes")
 
-async def fetch_checkins_and_notify():
-    try:
-        conn = await asyncpg.connect(DATABASE_URL)
+CREATOR_DIGEST_LEDGER = "creator_digest"
+
+# checkins are split across dispatcher shards by id
+SHARD_FILTER_SQL = "($%d::int IS NULL OR c.id %% $%d::int = $%d::int)"
+
+# the project creator's active plan, resolved in the same query as the checkins (p = projects)
+CREATOR_PLAN_SQL = """
+        LEFT JOIN LATERAL (
+            SELECT us.plan_id
+            FROM user_subscriptions us
+            WHERE us.user_id = p.creator_user_id
+                AND us.is_active = true
+            ORDER BY us.date_updated DESC
+            LIMIT 1
+        ) s ON true"""
+
+RECORD_LEDGER_SQL = """
+    INSERT INTO dispatch_ledger (name, last_completed_at, date_updated)
+    VALUES ($1, $2, $3)
+    ON CONFLICT (name) DO UPDATE
+    SET last_completed_at = GREATEST(dispatch_ledger.last_completed_at, EXCLUDED.last_completed_at),
+        date_updated = EXCLUDED.date_updated
+"""
+
+# paced emails wait in the outbox until their slot; the outbox worker renders and sends them
+OUTBOX_INSERT_SQL = """
+    INSERT INTO email_outbox (destination_email, subject, template, context, status, attempts, next_attempt_at, date_created)
+    SELECT v.destination_email, v.subject, v.template, v.context::jsonb, 'PENDING', 0, v.next_attempt_at, $6
+    FROM unnest($1::varchar[], $2::varchar[], $3::varchar[], $4::text[], $5::timestamptz[])
+        AS v(destination_email, subject, template, context, next_attempt_at)
+"""
 
-        now_utc = datetime.now(timezone.utc)
-        current_hour = now_utc.time().hour
-        current_day = now_utc.strftime("%A")
-        
+def _shard_args(shard) -> tuple:
+    return (shard.count, shard.index) if shard else (None, None)
+
+async def fetch_checkins_and_notify(now: datetime = None, checkin_ids: list[int] = None, shard=None,
+                                    email_infra: EmailInfra = None) -> list:
+    """
+    Send every due check-in and advance its schedule.
+
+    When checkin_ids is given (e.g. from the timing wheel) only those checkins are
+    considered, and a shard restricts the run to the checkins it owns.
+    Returns the (checkin_id, next_fire_at) pairs that were rescheduled, or None if the run failed.
+    """
+    try:
+        pool = await get_async_pool()
+        async with pool.acquire() as conn:
+            return await _dispatch_checkins(conn, now or datetime.now(timezone.utc), checkin_ids, shard,
+                                            email_infra or EmailInfra())
+    except Exception as e:
+        logging.error("fetch_checkins_and_notify failed with ex: %s", e)
+        return None
 
-        checkin_query = """
-            SELECT c.project_id, c.id, c.checkin_time_utc, c.user_timezone 
+async def fetch_checkin_schedules(min_id: int = 0, updated_since: datetime = None, shard=None,
+                                  checkin_ids: list[int] = None) -> list:
+    """
+    Active schedules for loading the timing wheel: new checkins (id > min_id) and recently
+    updated ones, or exactly the given checkin_ids.
+    """
+    pool = await get_async_pool()
+    async with pool.acquire() as conn:
+        if checkin_ids is not None:
+            return await conn.fetch("""
+                SELECT c.id, c.next_fire_at, c.is_active, c.project_ended
+                FROM checkins c
+                WHERE c.id = ANY($1::int[])
+            """, checkin_ids)
+        return await conn.fetch(f"""
+            SELECT c.id, c.next_fire_at, c.is_active, c.project_ended
             FROM checkins c
-            WHERE
-                c.is_active = true
-                AND c.project_ended = false
-                AND EXTRACT(HOUR FROM c.checkin_time_utc) = $1
-                AND $2 = ANY(c.checkin_days_utc)
-        """
+            WHERE ((c.id > $1 AND c.is_active = true AND c.project_ended = false)
+                OR ($2::timestamp IS NOT NULL AND c.date_updated >= $2::timestamp))
+                AND {SHARD_FILTER_SQL % (3, 3, 4)}
+        """, min_id, updated_since, *_shard_args(shard))
+
+async def backfill_next_fire_at(now: datetime = None, shard=None):
+    """Schedule active checkins created before next_fire_at existed."""
+    try:
+        now = now or datetime.now(timezone.utc)
+        pool = await get_async_pool()
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(f"""
+                SELECT c.id, c.user_checkin_days, c.user_checkin_time, c.user_timezone
+                FROM checkins c
+                WHERE c.is_active = true
+                    AND c.project_ended = false
+                    AND c.next_fire_at IS NULL
+                    AND {SHARD_FILTER_SQL % (1, 1, 2)}
+            """, *_shard_args(shard))
+            await _update_next_fire_at(conn, rows, now)
+            logging.info(f'-- scheduled {len(rows)} checkins without next_fire_at')
+    except Exception as e:
+        logging.error("backfill_next_fire_at failed with ex: %s", e)
+
+async def record_dispatch_window(ledger_name: str, completed_at: datetime):
+    """Remember the last window the dispatcher fully processed."""
+    try:
+        pool = await get_async_pool()
+        async with pool.acquire() as conn:
+            await conn.execute(RECORD_LEDGER_SQL, ledger_name, completed_at, datetime.now(timezone.utc).replace(tzinfo=None))
+    except Exception as e:
+        logging.error("record_dispatch_window failed with ex: %s", e)
+
+async def catch_up_missed_windows(ledger_name: str, now: datetime, lookback: timedelta, shard=None):
+    """
+    Prepare one set-based replay of the windows missed while no dispatcher was running.
+
+    Checkins due between the last completed window (bounded by lookback) and now keep
+    their next_fire_at, so the next dispatch sends them all in a single pass. Anything
+    older is stale: it is moved to its next occurrence after the look-back floor instead.
+    """
+    try:
+        pool = await get_async_pool()
+        async with pool.acquire() as conn:
+            last_completed = await conn.fetchval(
+                "SELECT last_completed_at FROM dispatch_ledger WHERE name = $1", ledger_name)
+            floor = now - lookback
+            if last_completed is not None:
+                floor = max(floor, last_completed)
+
+            stale = await conn.fetch(f"""
+                SELECT c.id, c.user_checkin_days, c.user_checkin_time, c.user_timezone
+                FROM checkins c
+                WHERE c.next_fire_at < $1
+                    AND c.is_active = true
+                    AND c.project_ended = false
+                    AND {SHARD_FILTER_SQL % (2, 2, 3)}
+            """, floor, *_shard_args(shard))
+            await _update_next_fire_at(conn, stale, floor)
 
-        #logging.info(checkin_query, current_hour, current_day)
+            missed = await conn.fetchval(f"""
+                SELECT count(*)
+                FROM checkins c
+                WHERE c.next_fire_at <= $1
+                    AND c.is_active = true
+                    AND c.project_ended = false
+                    AND {SHARD_FILTER_SQL % (2, 2, 3)}
+            """, now, *_shard_args(shard))
+            logging.info(f'-- catch-up from {floor.isoformat()}: {missed} missed checkins to replay, '
+                         f'{len(stale)} stale checkins rescheduled (last completed: {last_completed})')
+    except Exception as e:
+        logging.error("catch_up_missed_windows failed with ex: %s", e)
+
+async def send_due_reminders(now: datetime = None, delay: timedelta = timedelta(hours=3),
+                             batch_size: int = 1000, email_infra: EmailInfra = None) -> int:
+    """
+    Remind every member who has not responded to a check-in sent at least `delay` ago.
+
+    Each tracker is reminded once: a batch of trackers is claimed in one statement and
+    its non-responders found with a single anti-join against checkin_responses.
+    Reminders aren't time-critical, so they always go through the outbox rather than
+    being sent inside the scheduler tick. Returns the number of reminders queued.
+    """
+    now = now or datetime.now(timezone.utc)
+    naive_now = now.replace(tzinfo=None)
+    email_infra = email_infra or EmailInfra()
+    sent = 0
+    try:
+        pool = await get_async_pool()
+        async with pool.acquire() as conn:
+            while True:
+                batch = DispatchBatch(email_infra, durable=True)
+                # the reminders are committed to the outbox together with the claim
+                async with conn.transaction():
+                    # trackers older than a day past the delay are left alone, so turning
+                    # reminders on doesn't nag about old check-ins
+                    claimed = await conn.fetch("""
+                        UPDATE checkin_response_tracker t
+                        SET reminder_sent_at = $3
+                        FROM (
+                            SELECT crt.id
+                            FROM checkin_response_tracker crt
+                            JOIN checkins c ON c.id = crt.checkin_id
+                            WHERE crt.reminder_sent_at IS NULL
+                                AND crt.is_analytics_processed = false
+                                AND crt.date_created <= $1
+                                AND crt.date_created > $1 - interval '1 day'
+                                AND c.is_active = true
+                                AND c.project_ended = false
+                            ORDER BY crt.id
+                            LIMIT $2
+                            FOR UPDATE OF crt SKIP LOCKED
+                        ) due
+                        WHERE t.id = due.id
+                        RETURNING t.id
+                    """, naive_now - delay, batch_size, naive_now)
+                    if not claimed:
+                        break
+
+                    rows = await conn.fetch(f"""
+                        SELECT t.checkin_id, t.user_checkin_date, c.project_id, c.user_timezone, pm.user_email,
+                               COALESCE(s.plan_id, 0) AS plan_id
+                        FROM checkin_response_tracker t
+                        JOIN checkins c ON c.id = t.checkin_id
+                        JOIN projects p ON p.id = c.project_id
+                        {CREATOR_PLAN_SQL}
+                        JOIN project_members pm ON pm.project_id = c.project_id AND pm.is_active = true
+                        WHERE t.id = ANY($1::int[])
+                            AND NOT EXISTS (
+                                SELECT 1
+                                FROM checkin_responses r
+                                WHERE r.team_member_id = pm.id
+                                    AND r.checkin_id = t.checkin_id
+                                    AND r.checkin_date_usertz::date = t.user_checkin_date::date
+                            )
+                    """, [record['id'] for record in claimed])
+
+                    for row in rows:
+                        link = _checkin_link(row['project_id'], row['checkin_id'], row['user_email'],
+                                             row['user_checkin_date'], row['user_timezone'])
+                        batch.add(now, row['user_email'], "Reminder: Submit Your CheckIn", "submit_checkin",
+                                  {"link": link}, tier=tier_for_plan(row['plan_id']))
+                    await batch.enqueue(conn)
 
-        checkins = await conn.fetch(checkin_query, current_hour, current_day)
-        
+                sent += len(rows)
+
+                if len(claimed) < batch_size:
+                    break
+        if sent:
+            logging.info(f'-- sent {sent} check-in reminders')
+    except Exception as e:
+        logging.error("send_due_reminders failed with ex: %s", e)
+    return sent
+
+async def send_creator_digests(now: datetime = None, email_infra: EmailInfra = None) -> int:
+    """
+    Email every creator one summary of their live projects' check-ins since the last digest.
+
+    Covers the trackers created since the previous run (at most a day back): responses
+    received against expected, blocker counts and who hasn't responded, computed for all
+    creators at once with two queries. The digests are written to the outbox, so the
+    scheduler tick never waits on the whole batch. Returns the number of digests queued.
+    """
+    now = now or datetime.now(timezone.utc)
+    email_infra = email_infra or EmailInfra()
+    try:
+        pool = await get_async_pool()
+        async with pool.acquire() as conn:
+            last_completed = await conn.fetchval(
+                "SELECT last_completed_at FROM dispatch_ledger WHERE name = $1", CREATOR_DIGEST_LEDGER)
+            # another leader already sent today's
+            if last_completed is not None and last_completed > now - timedelta(hours=20):
+                return 0
+            since = max(now - timedelta(days=1), last_completed) if last_completed else now - timedelta(days=1)
+            # tracker timestamps are naive UTC
+            window = (since.replace(tzinfo=None), now.replace(tzinfo=None))
+
+            projects = await conn.fetch("""
+                SELECT p.creator_user_id, u.email AS creator_email, p.id AS project_id, p.title,
+                       sum(t.number_of_responses_expecting) AS expected,
+                       sum(t.number_of_responses_received) AS received,
+                       sum(b.blockers) AS blockers
+                FROM checkin_response_tracker t
+                JOIN checkins c ON c.id = t.checkin_id
+                JOIN projects p ON p.id = c.project_id
+                JOIN users u ON u.id = p.creator_user_id AND u.is_active = true
+                LEFT JOIN LATERAL (
+                    SELECT count(*) FILTER (WHERE r.has_blocker) AS blockers
+                    FROM checkin_responses r
+                    WHERE r.checkin_id = t.checkin_id
+                        AND r.checkin_date_usertz::date = t.user_checkin_date::date
+                ) b ON true
+                WHERE t.date_created > $1
+                    AND t.date_created <= $2
+                    AND p.is_active = true
+                    AND p.has_ended = false
+                GROUP BY p.creator_user_id, u.email, p.id, p.title
+                ORDER BY p.creator_user_id, p.id
+            """, *window)
+
+            non_responders = await conn.fetch("""
+                SELECT c.project_id, array_agg(DISTINCT pm.user_email) AS emails
+                FROM checkin_response_tracker t
+                JOIN checkins c ON c.id = t.checkin_id
+                JOIN projects p ON p.id = c.project_id
+                JOIN project_members pm ON pm.project_id = c.project_id AND pm.is_active = true
+                WHERE t.date_created > $1
+                    AND t.date_created <= $2
+                    AND p.is_active = true
+                    AND p.has_ended = false
+                    AND NOT EXISTS (
+                        SELECT 1
+                        FROM checkin_responses r
+                        WHERE r.team_member_id = pm.id
+                            AND r.checkin_id = t.checkin_id
+                            AND r.checkin_date_usertz::date = t.user_checkin_date::date
+                    )
+                GROUP BY c.project_id
+            """, *window)
+
+        missing = {row['project_id']: sorted(row['emails']) for row in non_responders}
+        digests = {}
+        for row in projects:
+            digest = digests.setdefault(row['creator_user_id'], (row['creator_email'], []))
+            digest[1].append({
+                "title": row['title'],
+                "expected": row['expected'] or 0,
+                "received": row['received'] or 0,
+                "blockers": row['blockers'] or 0,
+                "non_responders": missing.get(row['project_id'], []),
+            })
+
+        batch = DispatchBatch(email_infra, durable=True)
+        for creator_email, creator_projects in digests.values():
+            batch.add(now, creator_email, "Your Daily CheckIn Digest", "creator_digest", {"projects": creator_projects})
+        # the digests and the ledger entry that says they went out commit together
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await batch.enqueue(conn)
+                await conn.execute(RECORD_LEDGER_SQL, CREATOR_DIGEST_LEDGER, now,
+                                   datetime.now(timezone.utc).replace(tzinfo=None))
+
+        if digests:
+            logging.info(f'-- queued {len(digests)} creator digests covering {len(projects)} projects')
+        return len(digests)
+    except Exception as e:
+        logging.error("send_creator_digests failed with ex: %s", e)
+        return 0
+
+async def sweep_ended_projects(now: datetime = None, batch_size: int = 500) -> list:
+    """
+    Mark projects whose end_date has passed as ended, with their checkins, in batches.
+
+    Returns the ids of the checkins that were retired so callers can unschedule them.
+    """
+    now = now or datetime.now(timezone.utc)
+    # end_date is the last check-in day, so a project expires once that day is over
+    today = datetime.combine(now.date(), datetime.min.time())
+    retired = []
+    try:
+        pool = await get_async_pool()
+        async with pool.acquire() as conn:
+            while True:
+                row = await conn.fetchrow("""
+                    WITH ended AS (
+                        SELECT id FROM projects
+                        WHERE has_ended = false
+                            AND end_date < $1
+                        ORDER BY id
+                        LIMIT $2
+                        FOR UPDATE SKIP LOCKED
+                    ), projects_swept AS (
+                        UPDATE projects p
+                        SET has_ended = true, date_updated = $3
+                        FROM ended
+                        WHERE p.id = ended.id
+                        RETURNING p.id
+                    ), checkins_swept AS (
+                        UPDATE checkins c
+                        SET project_ended = true, next_fire_at = NULL, date_updated = $3
+                        FROM projects_swept
+                        WHERE c.project_id = projects_swept.id
+                        RETURNING c.id
+                    )
+                    SELECT (SELECT count(*) FROM projects_swept) AS projects,
+                           (SELECT array_agg(id) FROM checkins_swept) AS checkin_ids
+                """, today, batch_size, now.replace(tzinfo=None))
+                retired.extend(row['checkin_ids'] or [])
+                if row['projects'] < batch_size:
+                    break
+        if retired:
+            logging.info(f'-- retired {len(retired)} checkins of ended projects')
+    except Exception as e:
+        logging.error("sweep_ended_projects failed with ex: %s", e)
+    return retired
 
-        logging.info(f'-- found {len(checkins)} notifications')
-        #logging.info(checkins)
+async def _update_next_fire_at(conn, rows, after: datetime) -> list:
+    if not rows:
+        return []
+    ids = [row['id'] for row in rows]
+    next_fire_ats = [
+        compute_next_fire_at(row['user_checkin_days'], row['user_checkin_time'], row['user_timezone'], after)
+        for row in rows
+    ]
+    await conn.execute("""
+        UPDATE checkins c
+        SET next_fire_at = v.next_fire_at
+        FROM unnest($1::int[], $2::timestamptz[]) AS v(id, next_fire_at)
+        WHERE c.id = v.id
+    """, ids, next_fire_ats)
+    return list(zip(ids, next_fire_ats))
 
+async def _fetch_checkins(conn, until: datetime, checkin_ids: list[int] = None, shard=None, after: datetime = None) -> list:
+    # one round trip for every checkin due in (after, until], its active members and
+    # its creator's plan. next_fire_at keeps this an index range scan; paid plans sort
+    # first so they are claimed and sent ahead of the free fan-out.
+    checkin_query = f"""
+        SELECT c.project_id, c.id, c.next_fire_at, c.user_timezone,
+               c.user_checkin_days, c.user_checkin_time, p.title AS project_title,
+               COALESCE(s.plan_id, 0) AS plan_id,
+               COALESCE(m.member_emails, ARRAY[]::varchar[]) AS member_emails
+        FROM checkins c
+        JOIN projects p ON p.id = c.project_id
+        {CREATOR_PLAN_SQL}
+        LEFT JOIN LATERAL (
+            SELECT array_agg(pm.user_email ORDER BY pm.id) AS member_emails
+            FROM project_members pm
+            WHERE pm.project_id = c.project_id
+                AND pm.is_active = true
+        ) m ON true
+        WHERE
+            c.next_fire_at <= $1
+            AND ($5::timestamptz IS NULL OR c.next_fire_at > $5::timestamptz)
+            AND ($2::int[] IS NULL OR c.id = ANY($2::int[]))
+            AND {SHARD_FILTER_SQL % (3, 3, 4)}
+            AND c.is_active = true
+            AND c.project_ended = false
+        ORDER BY COALESCE(s.plan_id, 0) = 0, c.next_fire_at
+    """
+    return await conn.fetch(checkin_query, until, checkin_ids, *_shard_args(shard), after)
+
+def _checkin_payload(checkin_id: int, user_email: str, user_datetime: datetime, user_timezone: str) -> dict:
+    return {
+            "user_email": user_email,
+            "user_datetime":user_datetime.isoformat(),
+            "user_checkinday": user_datetime.strftime("%A"),
+            "user_timezone": user_timezone,
+            "checkin_id": checkin_id
+    }
+
+def _checkin_url(project_id: int, encrypted_payload: str) -> str:
+    return f"{FRONTEND_URL}/check-in?project_id={project_id}&payload={encrypted_payload}"
+
+def _checkin_link(project_id: int, checkin_id: int, user_email: str, user_datetime: datetime, user_timezone: str) -> str:
+    return _checkin_url(project_id, encrypt_payload(_checkin_payload(checkin_id, user_email, user_datetime, user_timezone)))
+
+def _build_checkin_emails(row, email_infra: EmailInfra) -> list:
+    """
+    Sign a link and render the email for every member of a checkin row.
+
+    Returns (email, subject, html, link) tuples. In grouping mode the single-project
+    html is rendered later, only for members who end up with one project.
+    """
+    # the nominal fire time, not the tick that picked it up
+    user_datetime = convert_datetime_to_timezone(row['next_fire_at'], row['user_timezone'])
+
+    members = row['member_emails']
+    tokens = encrypt_payloads(
+        _checkin_payload(row['id'], user_email, user_datetime, row['user_timezone']) for user_email in members
+    )
+    links = [_checkin_url(row['project_id'], token) for token in tokens]
+    if GROUP_CHECKIN_EMAILS:
+        htmls = [None] * len(links)
+    else:
+        htmls = email_infra.render_many("submit_checkin", ({"link": link} for link in links))
+    return [(user_email, "Submit Your CheckIn", html, link) for user_email, html, link in zip(members, htmls, links)]
+
+def _send_grouped(batch: "DispatchBatch", outgoing: dict):
+    """Send each person one email for all of their projects due in this run."""
+    # a merged email goes out in the best tier of its projects, paid people first
+    tiers = {user_email: TIER_PAID if any(item[5] == TIER_PAID for item in items) else TIER_FREE
+             for user_email, items in outgoing.items()}
+    for user_email, items in sorted(outgoing.items(), key=lambda item: tiers[item[0]] != TIER_PAID):
+        nominal_at = min(item[0] for item in items)
+        tier = tiers[user_email]
+        if len(items) == 1:
+            _, project_title, subject, html, link, _ = items[0]
+            batch.add(nominal_at, user_email, subject, "submit_checkin", {"link": link}, html, tier)
+            continue
+
+        projects = [{"title": project_title or "Your project", "link": link}
+                    for _, project_title, _, _, link, _ in items]
+        batch.add(nominal_at, user_email, "Submit Your CheckIns", "submit_checkins", {"projects": projects}, tier=tier)
+
+
+class DispatchBatch:
+    """
+    The emails of one dispatch run.
+
+    Emails on a tier with a send budget are paced through the durable outbox:
+    enqueue() writes them, with their send times, in the caller's transaction, so
+    they commit together with the trackers or ledger entries that claim them. The
+    rest are handed by send(), once that transaction has committed, to their tier's
+    lane, which sends them in the background within its own concurrency limit.
+    A durable batch writes every email to the outbox, due at once when its tier
+    isn't paced.
+    """
+
+    def __init__(self, email_infra: EmailInfra, durable: bool = False):
+        self.email_infra = email_infra
+        self.durable = durable
+        self._sends = []
+        # tier -> [(nominal_at, email, subject, template, context)]
+        self._outbox = {}
+
+    def add(self, nominal_at: datetime, user_email: str, subject: str, type: str, context: dict,
+            html: str = None, tier: str = TIER_FREE):
+        if self.durable or dispatch_queue.lane(tier).enabled:
+            self._outbox.setdefault(tier, []).append((nominal_at, user_email, subject, type, context))
+        else:
+            self._sends.append((tier, user_email, subject, html or self.email_infra.render_email(type, context)))
+
+    async def enqueue(self, conn) -> int:
+        rows = []
+        now = datetime.now(timezone.utc)
+        for tier, emails in self._outbox.items():
+            emails.sort(key=lambda email: email[0])
+            lane = dispatch_queue.lane(tier)
+            if lane.enabled:
+                # everything in a run is due by now, and no slot is handed out before now
+                send_times = lane.slots(emails[0][0], len(emails), now)
+            else:
+                send_times = [max(email[0], now) for email in emails]
+            rows.extend(email + (send_at,) for email, send_at in zip(emails, send_times))
+        self._outbox = {}
+        if rows:
+            await conn.execute(
+                OUTBOX_INSERT_SQL,
+                [row[1] for row in rows],
+                [row[2] for row in rows],
+                [row[3] for row in rows],
+                [json.dumps(row[4]) for row in rows],
+                [row[5] for row in rows],
+                now,
+            )
+        return len(rows)
+
+    def send(self):
+        sends, self._sends = self._sends, []
+        for tier, *email in sends:
+            dispatch_queue.lane(tier).submit(partial(self.email_infra.send_html_async, *email))
+
+
+class PrerenderedCheckins:
+    """
+    Check-in emails rendered ahead of their fire time, keyed by (checkin_id, next_fire_at).
+
+    An entry is only used if the member list at fire time still matches the one it was
+    rendered for; otherwise the emails are rebuilt at send time.
+    """
+
+    def __init__(self):
+        self._staged = {}
+
+    def __len__(self) -> int:
+        return len(self._staged)
+
+    def stage(self, row, emails: list):
+        self._staged[(row['id'], row['next_fire_at'])] = (tuple(row['member_emails']), emails)
+
+    def take(self, row):
+        staged = self._staged.pop((row['id'], row['next_fire_at']), None)
+        if staged and staged[0] == tuple(row['member_emails']):
+            return staged[1]
+        return None
+
+    def discard_before(self, fire_at: datetime):
+        for key in [key for key in self._staged if key[1] < fire_at]:
+            del self._staged[key]
+
+
+prerendered_checkins = PrerenderedCheckins()
+
+async def prerender_checkins(after: datetime, until: datetime, shard=None) -> int:
+    """Render the emails of checkins firing in (after, until] so fire time only has to send them."""
+    try:
+        pool = await get_async_pool()
+        async with pool.acquire() as conn:
+            checkins = await _fetch_checkins(conn, until, None, shard, after)
+
+        email_infra = EmailInfra()
         for row in checkins:
-            
-            email_infra = EmailInfra()
-            project_id = row['project_id']
-            #checkin_time_utc = row['checkin_time_utc']
-            user_timezone = row['user_timezone']
-            user_datetime = now_utc.astimezone(timezone(timedelta(hours=int(user_timezone))))
-            user_checkinday = user_datetime.strftime("%A")
-            checkin_id = row['id']
-
-            #get checkin
-            tracker_query = """
-            select id from checkin_response_tracker
-                where user_checkin_date::date = $1::date and checkin_id = $2
-            """
-
-            tracker_result = await conn.fetch(tracker_query, user_datetime, checkin_id)
-
-            if len(tracker_result) > 0:
-                logging.info(f'-- sent updates to the user already tracker_id: {json.dumps(tracker_result,indent=1)}')
-
-            members_query = """
-            SELECT user_email
-            FROM project_members
-            WHERE
-                project_id = $1
-                AND is_active = true
-            """
-            members = await conn.fetch(members_query, project_id)
-            logging.info(f'-- found {len(members)} members for project_id: {project_id}')
-
-            for member in members:
-                user_email = member["user_email"]
-                payload = {
-                        "user_email": user_email,
-                        "user_datetime":user_datetime.isoformat(),
-                        "user_checkinday": user_checkinday,
-                        "user_timezone": user_timezone,
-                        "checkin_id": checkin_id
-                }
-                #logging.info(payload)
-                encrypted_payload = encrypt_payload(payload)
-                link = f"{FRONTEND_URL}/check-in?project_id={project_id}&payload={encrypted_payload}"
-
-                #logging.info(f'-- found member and link: {link}')
-                email_infra.send_email(user_email, "Submit Your CheckIn", "submit_checkin", {"link": link})
-
-            insert_tracker_query = """
-                insert into checkin_response_tracker
-                (status, number_of_responses_expecting, user_checkin_date, checkin_id, date_created, from_server_name)
-                values ($1, $2, $3, $4, $5, $6)
-                """
-            await conn.execute(insert_tracker_query, 'EMAILS_SENT', len(members), user_datetime, checkin_id, datetime.now(timezone.utc), socket.gethostname())
-
-        await conn.close()
+            prerendered_checkins.stage(row, _build_checkin_emails(row, email_infra))
+        # anything still staged this far back was never sent (deactivated, edited)
+        prerendered_checkins.discard_before(after - timedelta(hours=1))
+        if checkins:
+            logging.info(f'-- prerendered {len(checkins)} checkins due by {until.isoformat()}')
+        return len(checkins)
     except Exception as e:
-        logging.error("fetch_checkins_and_notify failed with ex: %s", e)
+        logging.error("prerender_checkins failed with ex: %s", e)
+        return 0
+
+async def _dispatch_checkins(conn, now_utc: datetime, checkin_ids: list[int], shard,
+                             email_infra: EmailInfra) -> list:
+    checkins = await _fetch_checkins(conn, now_utc, checkin_ids, shard)
+
+    logging.info(f'-- found {len(checkins)} notifications')
+    #logging.info(checkins)
+    if not checkins:
+        return []
+
+    # user_checkin_date is the user's local wall-clock fire time
+    user_datetimes = [
+        convert_datetime_to_timezone(row['next_fire_at'], row['user_timezone']).replace(tzinfo=None)
+        for row in checkins
+    ]
+
+    # Claim each (checkin, local day) before sending anything. Rows that already have a
+    # tracker (restarts, overlapping runs, other workers) come back empty and are skipped.
+    insert_tracker_query = """
+        INSERT INTO checkin_response_tracker
+        (status, number_of_responses_expecting, number_of_responses_received, is_analytics_processed,
+         user_checkin_date, checkin_id, date_created, from_server_name)
+        SELECT 'EMAILS_SENT', v.expecting, 0, false, v.user_checkin_date, v.checkin_id, $4, $5
+        FROM unnest($1::int[], $2::int[], $3::timestamp[]) AS v(checkin_id, expecting, user_checkin_date)
+        ON CONFLICT (checkin_id, (user_checkin_date::date)) DO NOTHING
+        RETURNING checkin_id
+    """
+    batch = DispatchBatch(email_infra)
+    async with conn.transaction():
+        claimed = await conn.fetch(
+            insert_tracker_query,
+            [row['id'] for row in checkins],
+            [len(row['member_emails']) for row in checkins],
+            user_datetimes,
+            datetime.now(timezone.utc).replace(tzinfo=None),
+            socket.gethostname(),
+        )
+        # advance past this tick so a slow run can't fire the same schedule twice
+        rescheduled = await _update_next_fire_at(conn, checkins, now_utc)
+
+        claimed_ids = {record['checkin_id'] for record in claimed}
+        outgoing = {}
+
+        for row in checkins:
+            if row['id'] not in claimed_ids:
+                logging.info(f'-- sent updates to the user already checkin_id: {row["id"]}')
+                prerendered_checkins.take(row)
+                continue
+
+            members = row['member_emails']
+            logging.info(f'-- found {len(members)} members for project_id: {row["project_id"]}')
+
+            emails = prerendered_checkins.take(row)
+            if emails is None:
+                emails = _build_checkin_emails(row, email_infra)
+
+            tier = tier_for_plan(row['plan_id'])
+            for user_email, subject, html, link in emails:
+                if GROUP_CHECKIN_EMAILS:
+                    outgoing.setdefault(user_email.lower().strip(), []).append(
+                        (row['next_fire_at'], row['project_title'], subject, html, link, tier))
+                else:
+                    batch.add(row['next_fire_at'], user_email, subject, "submit_checkin", {"link": link}, html, tier)
+
+        if outgoing:
+            _send_grouped(batch, outgoing)
+        # paced emails commit with the trackers that claim them, so none is lost to a restart
+        await batch.enqueue(conn)
+    batch.send()
+
+    return rescheduled
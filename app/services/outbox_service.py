@@ -0,0 +1,254 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+import json
+import logging
+import os
+import time
+
+from dotenv import load_dotenv
+import httpx
+
+from app.core.database import get_async_pool
+from app.infra.email_infra import EmailInfra
+from app.infra.email_suppression import suppression_list
+from app.infra.email_transport import EMAIL_BATCH_LIMIT, get_email_backend, is_recipient_rejection
+from app.utils.metrics import prometheus_metric
+
+load_dotenv()
+
+logging.basicConfig(
+    format="%(asctime)s [%(process)d] [%(levelname)s] %(message)s",
+    level=logging.INFO
+)
+
+# web workers drain the outbox in the background; SKIP LOCKED lets several do so at once
+EMAIL_OUTBOX_WORKER_ENABLED = os.getenv("EMAIL_OUTBOX_WORKER_ENABLED", "true").lower() in ("1", "true", "yes")
+EMAIL_OUTBOX_POLL_SECONDS = float(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", "2"))
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "100"))
+# retries back off exponentially from the base up to the cap, until max attempts
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "8"))
+EMAIL_OUTBOX_RETRY_BASE_SECONDS = float(os.getenv("EMAIL_OUTBOX_RETRY_BASE_SECONDS", "30"))
+EMAIL_OUTBOX_RETRY_MAX_SECONDS = float(os.getenv("EMAIL_OUTBOX_RETRY_MAX_SECONDS", "3600"))
+# a claimed row is retried after this long if its worker died mid-send
+EMAIL_OUTBOX_LEASE_SECONDS = float(os.getenv("EMAIL_OUTBOX_LEASE_SECONDS", "300"))
+
+
+def retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=min(EMAIL_OUTBOX_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0),
+                                 EMAIL_OUTBOX_RETRY_MAX_SECONDS))
+
+
+class OutboxMetrics:
+    """Per-template counters for the outbox worker, since process start."""
+
+    def __init__(self):
+        self._templates = {}
+
+    def _get(self, template: str) -> dict:
+        return self._templates.setdefault(template, {"sent": 0, "retried": 0, "failed": 0, "suppressed": 0,
+                                                     "send_seconds": 0.0})
+
+    def record(self, template: str, outcome: str, count: int = 1, seconds: float = 0.0):
+        metrics = self._get(template)
+        metrics[outcome] += count
+        metrics["send_seconds"] += seconds
+
+    def stats(self) -> dict:
+        return {template: dict(metrics, send_seconds=round(metrics["send_seconds"], 3))
+                for template, metrics in self._templates.items()}
+
+    def render_prometheus(self) -> str:
+        stats = self.stats()
+        return prometheus_metric(
+            "email_outbox_emails_total", "counter", "Outbox emails by template and outcome.",
+            (({"template": template, "outcome": outcome}, metrics[outcome])
+             for template, metrics in sorted(stats.items()) for outcome in ("sent", "retried", "failed", "suppressed"))
+        ) + prometheus_metric(
+            "email_outbox_send_seconds_total", "counter", "Time spent sending outbox emails, by template.",
+            (({"template": template}, metrics["send_seconds"]) for template, metrics in sorted(stats.items()))
+        )
+
+
+outbox_metrics = OutboxMetrics()
+
+# read from the table rather than kept in memory, so any process serving /metrics reports
+# the same backlog, including emails paced by a dispatcher running elsewhere
+OUTBOX_BACKLOG_SQL = """
+    SELECT template,
+           count(*) AS pending,
+           count(*) FILTER (WHERE next_attempt_at <= now()) AS due,
+           COALESCE(EXTRACT(EPOCH FROM now() - min(next_attempt_at) FILTER (WHERE next_attempt_at <= now())), 0)
+               AS lag_seconds
+    FROM email_outbox
+    WHERE status = 'PENDING'
+    GROUP BY template
+"""
+
+async def render_outbox_backlog() -> str:
+    """Outbox depth and send lag per template, in the Prometheus text format."""
+    try:
+        pool = await get_async_pool()
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(OUTBOX_BACKLOG_SQL)
+    except Exception as e:
+        logging.error("render_outbox_backlog failed with ex: %s", e)
+        return ""
+    rows = sorted(rows, key=lambda row: row['template'])
+    return "".join(
+        prometheus_metric(f"email_outbox_{name}", "gauge", help,
+                          (({"template": row['template']}, round(float(row[name]), 3)) for row in rows))
+        for name, help in (
+            ("pending", "Outbox emails waiting to be sent, including paced ones not due yet."),
+            ("due", "Outbox emails whose send time has passed."),
+            ("lag_seconds", "How long the oldest due outbox email has been waiting."),
+        )
+    )
+
+async def drain_email_outbox(now: datetime = None, batch_size: int = EMAIL_OUTBOX_BATCH_SIZE,
+                             email_infra: EmailInfra = None) -> int:
+    """
+    Send one batch of due outbox emails through the provider's batch endpoint.
+
+    Rows are leased by pushing next_attempt_at out, so a crashed worker's batch is
+    picked up again later. Failed sends are retried with exponential backoff and
+    marked FAILED after EMAIL_OUTBOX_MAX_ATTEMPTS. Returns the number of rows claimed.
+    """
+    now = now or datetime.now(timezone.utc)
+    email_infra = email_infra or EmailInfra()
+    try:
+        pool = await get_async_pool()
+        async with pool.acquire() as conn:
+            claimed = await conn.fetch("""
+                UPDATE email_outbox o
+                SET attempts = o.attempts + 1, next_attempt_at = $3
+                FROM (
+                    SELECT id
+                    FROM email_outbox
+                    WHERE status = 'PENDING'
+                        AND next_attempt_at <= $1
+                    ORDER BY next_attempt_at
+                    LIMIT $2
+                    FOR UPDATE SKIP LOCKED
+                ) due
+                WHERE o.id = due.id
+                RETURNING o.id, o.destination_email, o.subject, o.template, o.context, o.attempts
+            """, now, batch_size, now + timedelta(seconds=EMAIL_OUTBOX_LEASE_SECONDS))
+            if not claimed:
+                return 0
+
+            rows, params_list, failures, skipped = [], [], [], []
+            for row in claimed:
+                # suppressed after it was queued
+                if suppression_list.should_skip(row['destination_email'], "outbox"):
+                    outbox_metrics.record(row['template'], "suppressed")
+                    skipped.append(row['id'])
+                    continue
+                try:
+                    context = row['context']
+                    html = email_infra.render_email(row['template'], json.loads(context) if isinstance(context, str) else context)
+                except Exception as e:
+                    # a template that can't render won't get better by retrying
+                    failures.append((row, str(e), True))
+                    continue
+                rows.append(row)
+                params_list.append(email_infra.build_params(row['destination_email'], row['subject'], html))
+
+            sent = []
+            # one provider request per chunk, so a chunk that fails never re-sends another
+            for start in range(0, len(rows), EMAIL_BATCH_LIMIT):
+                chunk = list(zip(rows[start:start + EMAIL_BATCH_LIMIT], params_list[start:start + EMAIL_BATCH_LIMIT]))
+                started = time.perf_counter()
+                try:
+                    responses = await get_email_backend().send_batch([params for _, params in chunk])
+                    chunk_sent = [(row, (response or {}).get("id")) for (row, _), response in zip(chunk, responses)]
+                except httpx.HTTPStatusError as e:
+                    if not _is_per_email_error(e):
+                        logging.error("email outbox batch send failed with ex: %s", e)
+                        failures.extend((row, str(e), False) for row, _ in chunk)
+                        continue
+                    # one bad email fails the whole batch request; find it by sending them one by one
+                    logging.info(f"-- email outbox batch rejected ({e.response.status_code}), sending {len(chunk)} individually")
+                    chunk_sent = await _send_individually(chunk, failures, skipped)
+                except Exception as e:
+                    logging.error("email outbox batch send failed with ex: %s", e)
+                    failures.extend((row, str(e), False) for row, _ in chunk)
+                    continue
+                elapsed = time.perf_counter() - started
+
+                for row, _ in chunk_sent:
+                    outbox_metrics.record(row['template'], "sent", seconds=elapsed / len(chunk))
+                sent.extend(chunk_sent)
+
+            if sent:
+                await conn.execute("""
+                    UPDATE email_outbox o
+                    SET status = 'SENT', date_sent = $3, provider_message_id = v.provider_message_id, last_error = NULL
+                    FROM unnest($1::int[], $2::varchar[]) AS v(id, provider_message_id)
+                    WHERE o.id = v.id
+                """, [row['id'] for row, _ in sent], [message_id for _, message_id in sent], datetime.now(timezone.utc))
+
+            if failures:
+                await _record_failures(conn, failures, now)
+
+            if skipped:
+                await conn.execute("UPDATE email_outbox SET status = 'SUPPRESSED' WHERE id = ANY($1::int[])", skipped)
+
+            logging.info(f'-- email outbox: {len(sent)} sent, {len(failures)} failed, {len(skipped)} suppressed of {len(claimed)}')
+            return len(claimed)
+    except Exception as e:
+        logging.error("drain_email_outbox failed with ex: %s", e)
+        return 0
+
+def _is_per_email_error(error: Exception) -> bool:
+    # rate limits and auth errors apply to every email alike; other 4xx may be one email's fault
+    if not isinstance(error, httpx.HTTPStatusError):
+        return False
+    status_code = error.response.status_code
+    return 400 <= status_code < 500 and status_code not in (401, 403, 429)
+
+async def _send_individually(chunk: list, failures: list, skipped: list) -> list:
+    """
+    Send each (row, params) on its own. A recipient the provider rejects is suppressed,
+    any other error that is this email's own fails it for good, the rest are retried.
+    """
+    backend = get_email_backend()
+    responses = await asyncio.gather(*(backend.send(params) for _, params in chunk), return_exceptions=True)
+    sent = []
+    for (row, _), response in zip(chunk, responses):
+        if not isinstance(response, Exception):
+            sent.append((row, (response or {}).get("id")))
+        elif is_recipient_rejection(response, row['destination_email']):
+            await suppression_list.suppress_async(row['destination_email'], "invalid", response.response.text[:500])
+            outbox_metrics.record(row['template'], "suppressed")
+            skipped.append(row['id'])
+        else:
+            detail = response.response.text[:500] if isinstance(response, httpx.HTTPStatusError) else ""
+            failures.append((row, f"{response} {detail}".strip(), _is_per_email_error(response)))
+    return sent
+
+async def _record_failures(conn, failures: list, now: datetime):
+    ids, statuses, next_attempts, errors = [], [], [], []
+    for row, error, permanent in failures:
+        give_up = permanent or row['attempts'] >= EMAIL_OUTBOX_MAX_ATTEMPTS
+        outbox_metrics.record(row['template'], "failed" if give_up else "retried")
+        ids.append(row['id'])
+        statuses.append('FAILED' if give_up else 'PENDING')
+        next_attempts.append(now + retry_delay(row['attempts']))
+        errors.append(error[:1000])
+
+    await conn.execute("""
+        UPDATE email_outbox o
+        SET status = v.status, next_attempt_at = v.next_attempt_at, last_error = v.last_error
+        FROM unnest($1::int[], $2::varchar[], $3::timestamptz[], $4::varchar[])
+            AS v(id, status, next_attempt_at, last_error)
+        WHERE o.id = v.id
+    """, ids, statuses, next_attempts, errors)
+
+async def run_outbox_worker():
+    """Drain the outbox continuously; back-to-back while there is a backlog, polling otherwise."""
+    email_infra = EmailInfra()
+    while True:
+        await suppression_list.refresh()
+        claimed = await drain_email_outbox(email_infra=email_infra)
+        if claimed < EMAIL_OUTBOX_BATCH_SIZE:
+            await asyncio.sleep(EMAIL_OUTBOX_POLL_SECONDS)
@@ -1,21 +1,23 @@
 from contextlib import contextmanager
-from datetime import date, datetime, timedelta, timezone
+from datetime import date, datetime, timezone
 import logging
 import os
 from sqlalchemy.sql import func
 from app.core.database import SessionLocal
 from sqlalchemy import extract
+from sqlalchemy.orm import Session
 
 from app.infra.email_infra import EmailInfra
 from app.models.project_model import CheckinModel, ProjectMemberModel, ProjectModel
 from app.models.response_model import CheckInResponseModel
 from app.models.subscription_model import UserSubscriptionModel
 from app.models.user_model import UserModel
+from app.scheduler.schedule_events import notify_checkin_changed
 from app.schemas.checkin_response_schema import CheckInResponse
 from app.schemas.project_schema import EnableDisableTeamMemberRequest, NewMemberRequest, ProjectAnalyticsResponse, ProjectDashboardResponse, ProjectDetailsResponse, ProjectMemberResponse, ProjectRequest, ProjectResponse, SendInvitationRequest
 from app.schemas.response_schema import BaseResponse
 from app.services.subscription_service import SubscriptionService
-from app.utils.helpers import convert_utc_days_and_time
+from app.utils.helpers import compute_next_fire_at, convert_datetime_to_timezone, convert_utc_days_and_time
 from sqlalchemy.exc import IntegrityError
 
 from fastapi import status
@@ -123,7 +125,8 @@ class ProjectService:
                     end_date=project_request.end_date,
                 )
                 db.add(project)
-                db.commit()
+                # flushed for its id only: the project, its checkin and the invitations commit together
+                db.flush()
 
                 checkin = CheckinModel(
                     project_id=project.id,
@@ -131,7 +134,11 @@ class ProjectService:
                     user_checkin_days=project_request.checkin_days,
                     user_timezone=project_request.timezone,
                     checkin_time_utc=checkin_time_utc,
-                    checkin_days_utc = checkin_days_utc
+                    checkin_days_utc = checkin_days_utc,
+                    next_fire_at=compute_next_fire_at(project_request.checkin_days,
+                                                      project_request.checkin_time,
+                                                      project_request.timezone,
+                                                      now)
                 )
 
                 db.add(checkin)
@@ -170,11 +177,12 @@ class ProjectService:
                 ))
 
                 db.add_all(list_of_members)
-                db.commit()
-
                 #send email to all members who are not users.
                 self.send_emails_to_members(project_request.members_emails
-                                            , project.title, project.id, user.email)
+                                            , project.title, project.id, user.email, db)
+                db.flush()
+                notify_checkin_changed(db, checkin.id)
+                db.commit()
 
                 return BaseResponse(
                     statusCode=status.HTTP_200_OK,
@@ -324,7 +332,9 @@ class ProjectService:
             checkin = db.query(CheckinModel).filter(CheckinModel.project_id == project_id).first()
             if checkin:
                 checkin.is_active = False
+                checkin.next_fire_at = None
                 checkin.date_updated = datetime.now(timezone.utc)
+                notify_checkin_changed(db, checkin.id)
                 
             db.commit()
             return BaseResponse(
@@ -349,7 +359,9 @@ class ProjectService:
             checkin = db.query(CheckinModel).filter(CheckinModel.project_id == project_id).first()
             if checkin:
                 checkin.is_active = False
+                checkin.next_fire_at = None
                 checkin.date_updated = datetime.now(timezone.utc)
+                notify_checkin_changed(db, checkin.id)
                 
             db.commit()
             return BaseResponse(
@@ -358,8 +370,8 @@ class ProjectService:
                 data=project_id
             )
     
-    def send_emails_to_members(self, emails:list[str], project_title:str, project_id:int, creator_email:str):
-        #send emails to all members who are not users.
+    def send_emails_to_members(self, emails:list[str], project_title:str, project_id:int, creator_email:str, db:Session):
+        #queue emails to all members who are not users; they go out when db commits.
         email_infra = EmailInfra()
 
         for email in emails:
@@ -367,8 +379,9 @@ class ProjectService:
             reject_encrypted_payload_url = encrypt_payload({"project_id": project_id, "email": email, "action": "reject"})
             
 
-            # send email verification
-            email_infra.send_email(
+            email_infra.enqueue_email(
+                db,
+                dedup_scope=str(project_id),
                 destinationEmail=email,
                 subject="Join a Project",
                 type="join_team",
@@ -498,7 +511,7 @@ class ProjectService:
             checkin_details = db.query(CheckinModel).filter(CheckinModel.project_id == project_id).first()
 
             #get current time in UTC and convert it to user timezone
-            date_usertz = datetime.now(timezone.utc).astimezone(timezone(timedelta(hours=int(checkin_details.user_timezone))))
+            date_usertz = convert_datetime_to_timezone(datetime.now(timezone.utc), checkin_details.user_timezone)
             should_have_checkin = False
 
             checkin_days_utc = checkin_details.user_checkin_days  # Already a list
@@ -632,8 +645,15 @@ class ProjectService:
                 checkin.user_checkin_days = project_request.checkin_days
                 checkin.user_checkin_time = project_request.checkin_time
                 checkin.user_timezone = project_request.timezone
-                checkin.checkin_time_utc=checkin_time_utc,
+                checkin.checkin_time_utc=checkin_time_utc
                 checkin.checkin_days_utc = checkin_days_utc
+                checkin.date_updated = datetime.now(timezone.utc)
+                if checkin.is_active:
+                    checkin.next_fire_at = compute_next_fire_at(project_request.checkin_days,
+                                                                project_request.checkin_time,
+                                                                project_request.timezone,
+                                                                checkin.date_updated)
+                notify_checkin_changed(db, checkin.id)
 
                 db.commit()
 
@@ -774,11 +794,10 @@ class ProjectService:
                         )
 
                 db.add(member)
-                db.commit()
-
                 #send email to all members who are not users.
                 self.send_emails_to_members([request.email]
-                                            , project.title, project.id, creator.email)
+                                            , project.title, project.id, creator.email, db)
+                db.commit()
                 
                 return BaseResponse(
                         statusCode=status.HTTP_200_OK,
@@ -837,7 +856,7 @@ class ProjectService:
                     )
                 
                 self.send_emails_to_members([member_user.user_email]
-                                            , project.title, project.id, creator.email)
+                                            , project.title, project.id, creator.email, db)
                 
                 return BaseResponse(
                         statusCode=status.HTTP_200_OK,
@@ -519,7 +519,8 @@ class ResponseService:
                             link = f"{FRONTEND_URL}/check-in?project_id={request.project_id}&payload={encrypted_payload}"
 
                             logging.info(f'-- found member and link: {link}')
-                            email_infra.send_email(user_email, "Submit Your CheckIn", "submit_checkin", {"link": link})
+                            email_infra.enqueue_email(db, user_email, "Submit Your CheckIn", "submit_checkin", {"link": link},
+                                                      dedup_scope=str(checkin.id))
                     
                     checkin_tracker = CheckInResponseTracker(
                         status = 'EMAILS_SENT',
@@ -565,8 +566,14 @@ class ResponseService:
                                 link = f"{FRONTEND_URL}/check-in?project_id={request.project_id}&payload={encrypted_payload}"
 
                                 logging.info(f'-- found member and link: {link}')
-                                email_infra.send_email(user_email, "Submit Your CheckIn", "submit_checkin", {"link": link})
-                                
+                                if not email_infra.enqueue_email(db, user_email, "Submit Your CheckIn", "submit_checkin",
+                                                                 {"link": link}, dedup_scope=str(checkin.id)):
+                                    return BaseResponse(
+                                        statusCode=status.HTTP_429_TOO_MANY_REQUESTS,
+                                        message="A reminder was sent to this member in the last few minutes",
+                                        data=None
+                                    )
+
                                 return BaseResponse(
                                     statusCode=status.HTTP_200_OK,
                                     message="Emails sent successfully",
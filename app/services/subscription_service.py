@@ -8,6 +8,7 @@ from app.core.database import SessionLocal
 from app.models.user_model import UserModel
 from app.schemas.auth_schema import SubscriptionResponse
 from app.schemas.response_schema import BaseResponse
+from app.utils.metrics import track_dependency
 from fastapi import status
 import os 
 from dotenv import load_dotenv
@@ -82,7 +83,8 @@ class SubscriptionService:
                     )
                 
                 #create user / get user on provider
-                create_user_response = self.paystack.Customer.create(email=user.email)
+                with track_dependency("paystack", "Customer.create"):
+                    create_user_response = self.paystack.Customer.create(email=user.email)
                 if create_user_response.status == False:
                     return BaseResponse(
                         statusCode=status.HTTP_400_BAD_REQUEST,
@@ -92,10 +94,11 @@ class SubscriptionService:
                 
                 external_customer_id = create_user_response.data['id']
                 #validate if user has subscription. if they do update the subscription table. 
-                subscription_for_user_plan = paystack.Subscription.list(
-                    plan=plan.external_plan_id,
-                    customer = external_customer_id
-                )
+                with track_dependency("paystack", "Subscription.list"):
+                    subscription_for_user_plan = paystack.Subscription.list(
+                        plan=plan.external_plan_id,
+                        customer = external_customer_id
+                    )
                 #pprint(subscription_for_user_plan)
                 if subscription_for_user_plan.status == False:
                     return BaseResponse(
@@ -131,13 +134,14 @@ class SubscriptionService:
                             message="User already has a valid subscription",
                             data=None
                         )
-                response = paystack.Transaction.initialize(
-                    email=user.email,
-                    amount=1,  # Replace with real amount
-                    plan=plan.external_plan_code,
-                    channels=['card'],
-                    callback_url=os.getenv("FRONTEND_URL")+'/dashboard'
-                )
+                with track_dependency("paystack", "Transaction.initialize"):
+                    response = paystack.Transaction.initialize(
+                        email=user.email,
+                        amount=1,  # Replace with real amount
+                        plan=plan.external_plan_code,
+                        channels=['card'],
+                        callback_url=os.getenv("FRONTEND_URL")+'/dashboard'
+                    )
 
                 if not response.status:
                     return BaseResponse(
@@ -280,7 +284,8 @@ class SubscriptionService:
     def handle_callback(self, txref:str, reference:str) -> BaseResponse[str]:
         try:
             with self.get_session() as db:
-                transaction = self.paystack.Transaction.verify(reference=reference)
+                with track_dependency("paystack", "Transaction.verify"):
+                    transaction = self.paystack.Transaction.verify(reference=reference)
                 if not transaction.status:
                     return BaseResponse(
                         statusCode=status.HTTP_400_BAD_REQUEST,
@@ -312,10 +317,11 @@ class SubscriptionService:
                     )
                 
                 
-                subscription_for_user_plan = paystack.Subscription.list(
-                    plan=user_plan.external_plan_id,
-                    customer = external_customer_id
-                )
+                with track_dependency("paystack", "Subscription.list"):
+                    subscription_for_user_plan = paystack.Subscription.list(
+                        plan=user_plan.external_plan_id,
+                        customer = external_customer_id
+                    )
 
                 if subscription_for_user_plan.data:
                     last_subscription = subscription_for_user_plan.data[-1]
@@ -9,6 +9,7 @@ from app.core.database import SessionLocal
 from typing import Optional
 from contextlib import contextmanager
 from app.services.subscription_service import SubscriptionService
+from app.utils.password_hasher import PasswordHasherBusy, password_hasher
 from app.utils.security import check_password, create_access_token, generate_encrypted_user_id, hash_password, decrypt_encrypted_user_id
 
 from app.schemas.auth_schema import GoogleLoginRequest, LoginRequest, RegisterRequest
@@ -52,7 +53,11 @@ class UserService:
                     data=None
                 )
             else:
-                hashed_password = hash_password(register_request.password.strip())
+                try:
+                    hashed_password = hash_password(register_request.password.strip())
+                except PasswordHasherBusy as e:
+                    logging.warning("register turned away: %s", e)
+                    return self._busy_response()
                 db_user = UserModel(
                     email=register_request.email.lower().strip(),
                     hashed_password=hashed_password,
@@ -60,10 +65,10 @@ class UserService:
                     is_guest=False
                 )
                 db.add(db_user)
-                db.commit()
-                db.refresh(db_user)
+                # flushed for its id only: the user and its verification email commit together
+                db.flush()
+                self.send_verify_email(db_user.id, db_user.email, db)
                 self.completed_user_profile_in_team_members(db_user.email, db, db_user.id)
-                self.send_verify_email(db_user.id, db_user.email)
 
                 return BaseResponse(
                     statusCode=status.HTTP_200_OK,
@@ -115,7 +120,7 @@ class UserService:
                     )
                 
                 if user.is_verified == False:
-                    self.send_verify_email(user.id, user.email)
+                    self.send_verify_email(user.id, user.email, db)
                     return BaseResponse(
                         statusCode=status.HTTP_400_BAD_REQUEST,
                         message="Email not verified, kindly click on the link in your email to verify your account",
@@ -132,6 +137,13 @@ class UserService:
                     if check_password(login_request.password.strip(), user.hashed_password):
                         access_token = create_access_token(user.id)
                         user.last_login = datetime.now(timezone.utc)
+                        # bcrypt cost changed since this hash was made; upgrading it can wait
+                        # for a login when the hasher isn't busy
+                        if password_hasher.needs_rehash(user.hashed_password):
+                            try:
+                                user.hashed_password = password_hasher.hash(login_request.password.strip(), timeout=0)
+                            except PasswordHasherBusy as e:
+                                logging.info("password rehash skipped: %s", e)
                         db.commit()
                         db.refresh(user)
 
@@ -154,6 +166,9 @@ class UserService:
                         message="User not found",
                         data=None
                     )
+        except PasswordHasherBusy as e:
+            logging.warning("login turned away: %s", e)
+            return self._busy_response()
         except Exception as e:
             logging.error("login failed with ex: %s", e)
             return BaseResponse(
@@ -166,7 +181,7 @@ class UserService:
         with self.get_session() as db:
             user = self.get_user_by_email(email, db)
             if user:
-                self.send_reset_password_email(user.id, user.email)
+                self.send_reset_password_email(user.id, user.email, db)
                 return BaseResponse(
                     statusCode=status.HTTP_200_OK,
                     message="Password reset email sent",  
@@ -204,7 +219,11 @@ class UserService:
         with self.get_session() as db:
             user = self.get_user_by_user_id(user_id, db)
             if user and user.to_changePassword:
-                user.hashed_password = hash_password(password.strip())
+                try:
+                    user.hashed_password = hash_password(password.strip())
+                except PasswordHasherBusy as e:
+                    logging.warning("update_password turned away: %s", e)
+                    return self._busy_response()
                 user.to_changePassword = False
                 user.date_updated = datetime.now(timezone.utc)
 
@@ -222,18 +241,26 @@ class UserService:
                     data=None
                 )    
                     
+    def _busy_response(self) -> BaseResponse[str]:
+        return BaseResponse(
+            statusCode=status.HTTP_503_SERVICE_UNAVAILABLE,
+            message="Too many requests right now, please try again shortly",
+            data=None
+        )
+
     def get_user_by_email(self, email: str, db:Session) -> Optional[UserModel]:
         return db.query(UserModel).filter(UserModel.email == email.lower().strip()).first()
     
     def get_user_by_user_id(self, id: int, db:Session) -> Optional[UserModel]:
         return db.query(UserModel).filter(UserModel.id == id).first()
 
-    def send_verify_email(self, user_id: int, email: str):
+    def send_verify_email(self, user_id: int, email: str, db: Session):
         verify_email_link = generate_encrypted_user_id(user_id)
         email_infra = EmailInfra()
 
-        # send email verification
-        email_infra.send_email(
+        # send email verification once the session commits
+        email_infra.enqueue_email(
+            db,
             destinationEmail=email,
             subject="DoTellBoard Verify your email",
             type="verify_email",
@@ -241,10 +268,11 @@ class UserService:
                 "link": f"{os.getenv('FRONTEND_URL')}/click?upnv={verify_email_link}"
             }
         )
-    def send_reset_password_email(self, user_id: int, email: str):
+    def send_reset_password_email(self, user_id: int, email: str, db: Session):
         reset_password_link = generate_encrypted_user_id(user_id)
         email_infra = EmailInfra()
-        email_infra.send_email(
+        email_infra.enqueue_email(
+            db,
             destinationEmail=email,
             subject="DoTellBoard Reset your password",
             type="reset_password",
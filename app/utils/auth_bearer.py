@@ -1,8 +1,83 @@
+import hashlib
+import os
+import threading
+import time
+
+from cachetools import TLRUCache
+from dotenv import load_dotenv
 from fastapi import Request, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 from app.utils.security import decode_token
 
+load_dotenv()
+
+# verified bearer tokens are remembered until their exp, capped at the max TTL; size 0 disables
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "10000"))
+JWT_CACHE_MAX_TTL_SECONDS = float(os.getenv("JWT_CACHE_MAX_TTL_SECONDS", "300"))
+
+
+class VerifiedTokenCache:
+    """
+    Decoded payloads of bearer tokens that already passed jwt.decode, keyed on the
+    token's digest. Entries expire at the token's exp (or after the max TTL, whichever
+    is first), so an expired token is never served from here. Invalid tokens aren't cached.
+    """
+
+    def __init__(self, maxsize: int = JWT_CACHE_SIZE, max_ttl: float = JWT_CACHE_MAX_TTL_SECONDS):
+        self.enabled = maxsize > 0
+        self.max_ttl = max_ttl
+        self._lock = threading.Lock()
+        # value is (payload, expires_at)
+        self._cache = TLRUCache(maxsize=max(maxsize, 1), ttu=lambda _key, value, now: value[1], timer=time.time)
+        self.hits = 0
+        self.misses = 0
+
+    def decode(self, token: str) -> dict:
+        if not self.enabled:
+            return decode_token(token)
+
+        key = hashlib.sha256(token.encode()).digest()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        payload = decode_token(token)
+        expires_at = time.time() + self.max_ttl
+        if isinstance(payload.get('exp'), (int, float)):
+            expires_at = min(expires_at, payload['exp'])
+        with self._lock:
+            self._cache[key] = (payload, expires_at)
+        return payload
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def render_prometheus(self) -> str:
+        return "\n".join([
+            "# HELP jwt_cache_hits_total Bearer tokens served from the verified-token cache.",
+            "# TYPE jwt_cache_hits_total counter",
+            f"jwt_cache_hits_total {self.hits}",
+            "# HELP jwt_cache_misses_total Bearer tokens that went through jwt.decode.",
+            "# TYPE jwt_cache_misses_total counter",
+            f"jwt_cache_misses_total {self.misses}",
+            "# HELP jwt_cache_entries Verified tokens currently cached.",
+            "# TYPE jwt_cache_entries gauge",
+            f"jwt_cache_entries {len(self._cache)}",
+        ]) + "\n"
+
+
+verified_tokens = VerifiedTokenCache()
 
 
 class JWTBearer(HTTPBearer):
@@ -23,6 +98,6 @@ class JWTBearer(HTTPBearer):
 
     def verify_jwt(self, jwtoken: str):
         try:
-            return decode_token(jwtoken)
+            return verified_tokens.decode(jwtoken)
         except:
-            return None
\ No newline at end of file
+            return None
@@ -1,5 +1,25 @@
-from datetime import datetime, time, timedelta, timezone
-from typing import List, Tuple
+from datetime import datetime, time, timedelta, timezone, tzinfo
+from typing import List, Optional, Tuple, Union
+from zoneinfo import ZoneInfo
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+
+def get_tzinfo(tz: str) -> tzinfo:
+    """
+    Resolve a user timezone to a tzinfo.
+
+    Args:
+        tz (str): Either an IANA zone name ("Africa/Lagos") or a legacy hour offset ("+1", "-10").
+
+    Returns:
+        tzinfo: A DST-aware ZoneInfo for IANA names, a fixed offset otherwise.
+    """
+    tz = tz.strip()
+    try:
+        return timezone(timedelta(hours=int(tz)))
+    except ValueError:
+        return ZoneInfo(tz)
 
 
 def convert_time_utc_with_tz(time_str: str, tz: str) -> time:
@@ -13,8 +33,7 @@ def convert_time_utc_with_tz(time_str: str, tz: str) -> time:
     Returns:
         datetime: The converted UTC datetime object.
     """
-    hours = int(tz)
-    local_offset = timezone(timedelta(hours=hours))
+    local_offset = get_tzinfo(tz)
     local_dt = datetime.strptime(time_str, "%H:%M")
     local_dt = local_dt.replace(tzinfo=local_offset)
     utc_dt = local_dt.astimezone(timezone.utc)
@@ -22,9 +41,6 @@ def convert_time_utc_with_tz(time_str: str, tz: str) -> time:
     return utc_dt.time()
 
 
-from datetime import datetime, timedelta, timezone
-from typing import List, Tuple
-
 def convert_utc_days_and_time(days: List[str], time_str: str, tz: str) -> Tuple[List[str], str]:
     """
     Convert a list of days and a time string to UTC with the given timezone.
@@ -37,12 +53,11 @@ def convert_utc_days_and_time(days: List[str], time_str: str, tz: str) -> Tuple[
     Returns:
         Tuple[List[str], str]: A tuple containing the converted list of UTC days and the UTC time string.
     """
-    weekdays = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+    weekdays = WEEKDAYS
     utc_days = []
 
     # Parse timezone offset
-    hours = int(tz)
-    local_tz = timezone(timedelta(hours=hours))
+    local_tz = get_tzinfo(tz)
 
     # Use the first day as a reference to get UTC time
     first_day_index = weekdays.index(days[0])
@@ -78,6 +93,37 @@ def convert_datetime_to_timezone(dt: datetime, tz: str) -> datetime:
     Returns:
         datetime: The converted datetime object.
     """
-    hours = int(tz)
-    local_tz = timezone(timedelta(hours=hours))
-    return dt.astimezone(local_tz)
\ No newline at end of file
+    return dt.astimezone(get_tzinfo(tz))
+
+def compute_next_fire_at(days: List[str], checkin_time: Union[str, time], tz: str, after: datetime) -> Optional[datetime]:
+    """
+    Compute the next UTC instant a check-in is due, strictly after the given instant.
+
+    The check-in time is interpreted as wall-clock time in the user's timezone, so
+    schedules in IANA zones keep their local time across DST changes.
+
+    Args:
+        days (List[str]): The local check-in days. ["Monday", "Tuesday"]
+        checkin_time (str | time): The local check-in time. "09:30" in 24-hour format.
+        tz (str): The user's timezone. Example: "Europe/London", "+1"
+        after (datetime): An aware datetime; the result is always later than it.
+
+    Returns:
+        Optional[datetime]: The next fire time in UTC, or None if no days are set.
+    """
+    if not days:
+        return None
+    if isinstance(checkin_time, str):
+        checkin_time = datetime.strptime(checkin_time, "%H:%M").time()
+    local_tz = get_tzinfo(tz)
+    local_date = after.astimezone(local_tz).date()
+
+    for offset in range(8):
+        candidate_date = local_date + timedelta(days=offset)
+        if WEEKDAYS[candidate_date.weekday()] not in days:
+            continue
+        candidate = datetime.combine(candidate_date, checkin_time.replace(second=0, microsecond=0), tzinfo=local_tz)
+        candidate_utc = candidate.astimezone(timezone.utc)
+        if candidate_utc > after:
+            return candidate_utc
+    return None
\ No newline at end of file
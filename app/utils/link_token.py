@@ -0,0 +1,172 @@
+"""
+v2 signed-link tokens: a compact binary encoding of a flat payload dict with a single
+truncated HMAC-SHA256, written as "v2." + unpadded urlsafe base64.
+
+    version (1 byte) | fields | mac (16 bytes)
+
+Each field is a key (one byte from KNOWN_KEYS, or 0xFF followed by the key as a
+string) and a typed value. Ints are zigzag varints, strings are varint-length UTF-8.
+The payloads are flat dicts of str/int/bool/None/float, which is all the app signs.
+"""
+import base64
+from functools import lru_cache
+import hashlib
+import hmac
+import os
+import struct
+from typing import Iterable, List
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TOKEN_PREFIX = "v2."
+VERSION = 2
+MAC_SIZE = 16
+
+# append only: codes are baked into links already sent
+KNOWN_KEYS = ("user_email", "user_datetime", "user_checkinday", "user_timezone", "checkin_id",
+              "project_id", "email", "action", "user_id")
+_KEY_CODES = {key: code for code, key in enumerate(KNOWN_KEYS)}
+_LITERAL_KEY = 0xFF
+
+_INT, _STR, _TRUE, _FALSE, _NONE, _FLOAT = range(6)
+
+
+@lru_cache(maxsize=1)
+def _base_mac() -> hmac.HMAC:
+    # derived so a v2 MAC can never double as a signature elsewhere; copied per token
+    key = hmac.new(os.getenv('JWT_SECRET_KEY').encode(), b"link-token-v2", hashlib.sha256).digest()
+    return hmac.new(key, digestmod=hashlib.sha256)
+
+
+def _write_varint(out: bytearray, value: int):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def _read_varint(data: bytes, pos: int):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+def _write_str(out: bytearray, value: str):
+    encoded = value.encode()
+    _write_varint(out, len(encoded))
+    out += encoded
+
+def _read_str(data: bytes, pos: int):
+    length, pos = _read_varint(data, pos)
+    end = pos + length
+    if end > len(data):
+        raise ValueError("truncated token")
+    return data[pos:end].decode(), end
+
+
+def _encode(payload: dict) -> bytearray:
+    out = bytearray((VERSION,))
+    for key, value in payload.items():
+        code = _KEY_CODES.get(key)
+        if code is None:
+            out.append(_LITERAL_KEY)
+            _write_str(out, key)
+        else:
+            out.append(code)
+
+        if value is True:
+            out.append(_TRUE)
+        elif value is False:
+            out.append(_FALSE)
+        elif value is None:
+            out.append(_NONE)
+        elif isinstance(value, int):
+            out.append(_INT)
+            _write_varint(out, value << 1 if value >= 0 else ((-value) << 1) - 1)
+        elif isinstance(value, float):
+            out.append(_FLOAT)
+            out += struct.pack(">d", value)
+        elif isinstance(value, str):
+            out.append(_STR)
+            _write_str(out, value)
+        else:
+            raise TypeError(f"cannot sign {type(value).__name__} value for {key}")
+    return out
+
+def _decode(body: bytes) -> dict:
+    if not body or body[0] != VERSION:
+        raise ValueError("unsupported token version")
+    payload = {}
+    pos = 1
+    while pos < len(body):
+        code = body[pos]
+        pos += 1
+        if code == _LITERAL_KEY:
+            key, pos = _read_str(body, pos)
+        elif code < len(KNOWN_KEYS):
+            key = KNOWN_KEYS[code]
+        else:
+            raise ValueError("unknown field")
+
+        kind = body[pos]
+        pos += 1
+        if kind == _INT:
+            raw, pos = _read_varint(body, pos)
+            payload[key] = (raw >> 1) ^ -(raw & 1)
+        elif kind == _STR:
+            payload[key], pos = _read_str(body, pos)
+        elif kind == _TRUE:
+            payload[key] = True
+        elif kind == _FALSE:
+            payload[key] = False
+        elif kind == _NONE:
+            payload[key] = None
+        elif kind == _FLOAT:
+            payload[key] = struct.unpack_from(">d", body, pos)[0]
+            pos += 8
+        else:
+            raise ValueError("unknown value type")
+    return payload
+
+
+def sign(payload: dict) -> str:
+    return sign_many((payload,))[0]
+
+def sign_many(payloads: Iterable[dict]) -> List[str]:
+    """Sign a batch of payloads, e.g. one link per member of a check-in fan-out."""
+    base = _base_mac()
+    tokens = []
+    for payload in payloads:
+        body = _encode(payload)
+        mac = base.copy()
+        mac.update(body)
+        body += mac.digest()[:MAC_SIZE]
+        tokens.append(TOKEN_PREFIX + base64.urlsafe_b64encode(body).rstrip(b"=").decode())
+    return tokens
+
+def verify(token: str) -> dict:
+    """Return the payload of a v2 token, or raise ValueError if it was not signed by us."""
+    if not token.startswith(TOKEN_PREFIX):
+        raise ValueError("not a v2 token")
+    encoded = token[len(TOKEN_PREFIX):]
+    try:
+        raw = base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4))
+    except Exception:
+        raise ValueError("malformed token")
+    if len(raw) <= MAC_SIZE:
+        raise ValueError("malformed token")
+
+    body, signature = raw[:-MAC_SIZE], raw[-MAC_SIZE:]
+    mac = _base_mac().copy()
+    mac.update(body)
+    if not hmac.compare_digest(mac.digest()[:MAC_SIZE], signature):
+        raise ValueError("Invalid signature")
+    try:
+        return _decode(body)
+    except (IndexError, UnicodeDecodeError, struct.error) as e:
+        raise ValueError(f"malformed token: {e}")
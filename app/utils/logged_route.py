@@ -4,6 +4,9 @@ from starlette.responses import StreamingResponse
 from typing import Callable
 import logging
 import json
+import time
+
+from app.utils.metrics import finish_request_tracking, format_request_calls, start_request_tracking
 
 SENSITIVE_KEYS = frozenset({"password", "token", "secret", "access_token", "authorization", "auth", "api_key"})
 
@@ -51,8 +54,16 @@ class LoggedRoute(APIRoute):
                 return {"type": "http.request", "body": body_bytes}
             request._receive = receive
 
-            # --- Call original handler ---
-            response: Response = await original_handler(request)
+            # --- Call original handler, noting the dependency calls it makes ---
+            started = time.perf_counter()
+            tracking = start_request_tracking()
+            try:
+                response: Response = await original_handler(request)
+            finally:
+                dependency_calls = finish_request_tracking(tracking)
+            timing = f"{(time.perf_counter() - started) * 1000:.0f}ms"
+            if dependency_calls:
+                timing += f" ({format_request_calls(dependency_calls)})"
 
             response_body = b""
             if isinstance(response, StreamingResponse):
@@ -77,11 +88,11 @@ class LoggedRoute(APIRoute):
                 masked = mask_sensitive(parsed)
                 safe_response_body = json.dumps(masked, separators=(",", ":"))
                 logging.info(
-                    f"<<< {request.method} {request.url.path} | Status: {response.status_code} | JSON: {safe_response_body[:500]}..."
+                    f"<<< {request.method} {request.url.path} | Status: {response.status_code} | Time: {timing} | JSON: {safe_response_body[:500]}..."
                 )
             except Exception:
                 logging.info(
-                    f"<<< {request.method} {request.url.path} | Status: {response.status_code} | Raw: {response_body[:500]!r}"
+                    f"<<< {request.method} {request.url.path} | Status: {response.status_code} | Time: {timing} | Raw: {response_body[:500]!r}"
                 )
 
             return response
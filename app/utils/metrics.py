@@ -0,0 +1,130 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# seconds; the last bucket is +Inf
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# dependency -> [calls, errors, seconds] for the request being handled, if any
+_request_calls: ContextVar[Optional[Dict[str, list]]] = ContextVar("request_dependency_calls", default=None)
+
+
+class DependencyStats:
+    __slots__ = ("calls", "errors", "in_flight", "seconds", "buckets")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.seconds = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+
+class DependencyMetrics:
+    """
+    Latency histograms, error counts and in-flight gauges per (dependency, operation).
+
+    Calls are recorded with track(); the totals are rendered in the Prometheus text
+    format for /metrics, and each request's share is logged by LoggedRoute.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[Tuple[str, str], DependencyStats] = {}
+
+    def _get(self, dependency: str, operation: str) -> DependencyStats:
+        key = (dependency, operation)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats.setdefault(key, DependencyStats())
+        return stats
+
+    @contextmanager
+    def track(self, dependency: str, operation: str):
+        """Time the wrapped call. Works around awaits too, so async code can use it as-is."""
+        stats = self._get(dependency, operation)
+        with self._lock:
+            stats.in_flight += 1
+        failed = False
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self.observe(dependency, operation, time.perf_counter() - started, failed, stats)
+
+    def observe(self, dependency: str, operation: str, seconds: float, failed: bool = False,
+                stats: Optional[DependencyStats] = None):
+        """Record a finished call; with stats given, the in-flight gauge taken by track() is released."""
+        in_flight = stats is not None
+        stats = stats or self._get(dependency, operation)
+        with self._lock:
+            if in_flight:
+                stats.in_flight -= 1
+            stats.calls += 1
+            stats.errors += failed
+            stats.seconds += seconds
+            stats.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+        request_calls = _request_calls.get()
+        if request_calls is not None:
+            totals = request_calls.setdefault(dependency, [0, 0, 0.0])
+            totals[0] += 1
+            totals[1] += failed
+            totals[2] += seconds
+
+    def render_prometheus(self) -> str:
+        lines = [
+            "# HELP dependency_call_seconds Latency of calls to outbound dependencies.",
+            "# TYPE dependency_call_seconds histogram",
+        ]
+        errors = ["# HELP dependency_call_errors_total Failed calls to outbound dependencies.",
+                  "# TYPE dependency_call_errors_total counter"]
+        in_flight = ["# HELP dependency_calls_in_flight Calls to outbound dependencies in progress.",
+                     "# TYPE dependency_calls_in_flight gauge"]
+        with self._lock:
+            for (dependency, operation), stats in sorted(self._stats.items()):
+                labels = f'dependency="{dependency}",operation="{operation}"'
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), stats.buckets):
+                    cumulative += count
+                    lines.append(f'dependency_call_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"dependency_call_seconds_sum{{{labels}}} {stats.seconds:.6f}")
+                lines.append(f"dependency_call_seconds_count{{{labels}}} {stats.calls}")
+                errors.append(f"dependency_call_errors_total{{{labels}}} {stats.errors}")
+                in_flight.append(f"dependency_calls_in_flight{{{labels}}} {stats.in_flight}")
+        return "\n".join(lines + errors + in_flight) + "\n"
+
+
+dependency_metrics = DependencyMetrics()
+track_dependency = dependency_metrics.track
+
+
+def prometheus_metric(name: str, kind: str, help: str, samples) -> str:
+    """One metric in the Prometheus text format; samples are (labels dict or None, value) pairs."""
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        label_text = ",".join(f'{key}="{label}"' for key, label in labels.items()) if labels else ""
+        lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def start_request_tracking():
+    """Collect the dependency calls made while handling the current request."""
+    return _request_calls.set({})
+
+def finish_request_tracking(token) -> Dict[str, list]:
+    calls = _request_calls.get() or {}
+    _request_calls.reset(token)
+    return calls
+
+def format_request_calls(calls: Dict[str, list]) -> str:
+    return " ".join(
+        f"{dependency}={count}x/{seconds * 1000:.0f}ms" + (f"/{errors}err" if errors else "")
+        for dependency, (count, errors, seconds) in sorted(calls.items())
+    )
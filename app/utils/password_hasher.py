@@ -0,0 +1,186 @@
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+import threading
+import time
+
+import bcrypt
+from dotenv import load_dotenv
+
+from app.utils.metrics import dependency_metrics
+
+load_dotenv()
+
+logging.basicConfig(
+    format="%(asctime)s [%(process)d] [%(levelname)s] %(message)s",
+    level=logging.INFO
+)
+
+# bcrypt runs on its own small pool. Every pending call holds a request threadpool
+# thread, so at most this many are let in at once (and never more than a quarter of the
+# threadpool, see fit_threadpool); past it callers wait up to the queue timeout for a
+# turn and are only turned away once it expires
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "8"))
+PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS", "5"))
+# a fixed cost skips calibration; otherwise the highest cost within the target latency is used
+BCRYPT_ROUNDS = os.getenv("BCRYPT_ROUNDS")
+BCRYPT_TARGET_MS = float(os.getenv("BCRYPT_TARGET_MS", "250"))
+# bcrypt.gensalt()'s default; calibration only ever raises the cost above it
+BCRYPT_DEFAULT_ROUNDS = 12
+BCRYPT_MIN_ROUNDS = max(int(os.getenv("BCRYPT_MIN_ROUNDS", str(BCRYPT_DEFAULT_ROUNDS))), BCRYPT_DEFAULT_ROUNDS)
+BCRYPT_MAX_ROUNDS = int(os.getenv("BCRYPT_MAX_ROUNDS", "14"))
+# calibration times this cheaper cost and extrapolates, so startup isn't held up
+BCRYPT_PROBE_ROUNDS = 10
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    """
+    Bounded executor for bcrypt hashing and verification.
+
+    Calls block the calling (threadpool) thread until their turn, never the event loop;
+    the pending limit keeps a login burst from tying up the threads other sync endpoints
+    need, and callers over it wait for a slot until their timeout. rounds is the cost new hashes get; calibrate() sets it from the measured speed
+    of this host, and needs_rehash() tells login when a stored hash should be upgraded.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_pending: int = PASSWORD_HASH_MAX_PENDING,
+                 queue_timeout: float = PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self._slot_free = threading.Condition(self._lock)
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self.fixed_rounds = BCRYPT_ROUNDS is not None
+        self.rounds = int(BCRYPT_ROUNDS) if self.fixed_rounds else BCRYPT_DEFAULT_ROUNDS
+        self.pending = 0
+        self.peak_pending = 0
+        self.rejected = 0
+        self.completed = 0
+        self.wait_seconds = 0.0
+
+    def _run(self, operation: str, fn, *args, timeout: float = None):
+        queued_at = time.perf_counter()
+        timeout = self.queue_timeout if timeout is None else timeout
+        with self._slot_free:
+            if not self._slot_free.wait_for(lambda: self.pending < self.max_pending, timeout):
+                self.rejected += 1
+                raise PasswordHasherBusy(f"{self.pending} password operations pending after {timeout:.1f}s")
+            self.pending += 1
+            self.peak_pending = max(self.peak_pending, self.pending)
+
+        timings = {}
+
+        def work():
+            started = time.perf_counter()
+            timings["wait"] = started - queued_at
+            try:
+                return fn(*args)
+            finally:
+                timings["run"] = time.perf_counter() - started
+
+        failed = False
+        try:
+            return self._executor.submit(work).result()
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            with self._slot_free:
+                self.pending -= 1
+                self.completed += 1
+                self.wait_seconds += timings.get("wait", 0.0)
+                self._slot_free.notify()
+            # recorded here rather than in the pool thread so it counts towards the request
+            dependency_metrics.observe("bcrypt", operation, timings.get("run", 0.0), failed)
+
+    def fit_threadpool(self, threads: int):
+        """Cap the pending limit at a quarter of the request threadpool (AnyIO's, 40 by default)."""
+        limit = max(threads // 4, 1)
+        if self.max_pending > limit:
+            logging.info(f"password hash pending limit lowered from {self.max_pending} to {limit} for a {threads}-thread pool")
+            self.max_pending = limit
+
+    def hash(self, password: str, timeout: float = None) -> str:
+        return self._run("hash", _hashpw, password, self.rounds, timeout=timeout)
+
+    def check(self, password: str, hashed_password: str, timeout: float = None) -> bool:
+        return self._run("check", _checkpw, password, hashed_password, timeout=timeout)
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """
+        True if the stored hash should be replaced on the next successful login.
+
+        A calibrated cost only ever upgrades hashes: workers on different hosts may
+        calibrate a round apart and shouldn't rehash each other's passwords back and forth.
+        """
+        try:
+            cost = int(hashed_password.split("$")[2])
+        except (IndexError, ValueError):
+            return True
+        return cost != self.rounds if self.fixed_rounds else cost < self.rounds
+
+    def calibrate(self, target_ms: float = BCRYPT_TARGET_MS) -> int:
+        """
+        Pick the highest cost whose hash takes at most target_ms here (each round doubles
+        the time), but never less than BCRYPT_MIN_ROUNDS: a slow host gets slower logins,
+        not weaker hashes.
+        """
+        if self.fixed_rounds:
+            return self.rounds
+        samples = []
+        for _ in range(3):
+            started = time.perf_counter()
+            _hashpw("calibration", BCRYPT_PROBE_ROUNDS)
+            samples.append(time.perf_counter() - started)
+        probe_ms = min(samples) * 1000
+
+        rounds = BCRYPT_MIN_ROUNDS
+        while rounds < BCRYPT_MAX_ROUNDS and probe_ms * 2 ** (rounds + 1 - BCRYPT_PROBE_ROUNDS) <= target_ms:
+            rounds += 1
+        self.rounds = rounds
+        logging.info(f"bcrypt calibrated to cost {rounds} (~{probe_ms * 2 ** (rounds - BCRYPT_PROBE_ROUNDS):.0f}ms, target {target_ms:.0f}ms)")
+        return rounds
+
+    def stats(self) -> dict:
+        return {
+            "rounds": self.rounds,
+            "pending": self.pending,
+            "peak_pending": self.peak_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.wait_seconds / self.completed * 1000, 1) if self.completed else 0.0,
+        }
+
+    def render_prometheus(self) -> str:
+        return "\n".join([
+            "# HELP password_hash_pending Password hash/check calls queued or running.",
+            "# TYPE password_hash_pending gauge",
+            f"password_hash_pending {self.pending}",
+            "# HELP password_hash_rejected_total Password hash/check calls turned away after the queue timeout.",
+            "# TYPE password_hash_rejected_total counter",
+            f"password_hash_rejected_total {self.rejected}",
+            "# HELP password_hash_queue_wait_seconds_total Time password calls spent waiting for a slot and a worker.",
+            "# TYPE password_hash_queue_wait_seconds_total counter",
+            f"password_hash_queue_wait_seconds_total {self.wait_seconds:.6f}",
+            "# HELP password_hash_rounds bcrypt cost given to new hashes.",
+            "# TYPE password_hash_rounds gauge",
+            f"password_hash_rounds {self.rounds}",
+        ]) + "\n"
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+def _hashpw(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+def _checkpw(password: str, hashed_password: str) -> bool:
+    return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+
+password_hasher = PasswordHasher()
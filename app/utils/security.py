@@ -1,5 +1,4 @@
 from datetime import datetime, timedelta, timezone
-import bcrypt
 from fastapi import HTTPException
 import jwt
 import os
@@ -9,14 +8,21 @@ import string
 import base64
 import hmac
 import hashlib
+from typing import Iterable, List
+
+from app.utils import link_token
+from app.utils.password_hasher import password_hasher
 
 load_dotenv()
 
+# read once; decode_token runs on every authenticated request
+JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY')
+
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return password_hasher.hash(password)
 
 def check_password(password: str, hashed_password: str) -> bool:
-    return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+    return password_hasher.check(password, hashed_password)
 
 def generate_salt(length: int = 16) -> str:
     return secrets.token_urlsafe(length)
@@ -94,7 +100,7 @@ def create_access_token(user_id: int) -> str:
     }
     token = jwt.encode(
         payload,
-        os.getenv('JWT_SECRET_KEY'),
+        JWT_SECRET_KEY,
         algorithm='HS256'
     )
     return token
@@ -103,7 +109,7 @@ def decode_token(token: str):
     try:
         payload = jwt.decode(
             token,
-            os.getenv('JWT_SECRET_KEY'),
+            JWT_SECRET_KEY,
             algorithms=['HS256']
         )
         return payload
@@ -114,7 +120,27 @@ def decode_token(token: str):
     
 
 
-def encrypt_payload (payload: dict) -> str:
+# v1 links (triple-signed JWT) keep working unless a cutoff is set, e.g. 2026-12-01T00:00:00+00:00
+V1_LINK_TOKENS_ACCEPTED_UNTIL = os.getenv("V1_LINK_TOKENS_ACCEPTED_UNTIL")
+
+def encrypt_payload(payload: dict) -> str:
+    return link_token.sign(payload)
+
+def encrypt_payloads(payloads: Iterable[dict]) -> List[str]:
+    """encrypt_payload for a batch of links; the signing key is set up once for all of them."""
+    return link_token.sign_many(payloads)
+
+def decrypt_payload(encrypted_payload: str) -> dict:
+    if encrypted_payload.startswith(link_token.TOKEN_PREFIX):
+        try:
+            return link_token.verify(encrypted_payload)
+        except Exception as e:
+            raise ValueError(f"Invalid token: {str(e)}")
+    if V1_LINK_TOKENS_ACCEPTED_UNTIL and datetime.now(timezone.utc) > datetime.fromisoformat(V1_LINK_TOKENS_ACCEPTED_UNTIL):
+        raise ValueError("Invalid token: link format no longer accepted")
+    return decrypt_payload_v1(encrypted_payload)
+
+def encrypt_payload_v1(payload: dict) -> str:
     # Convert payload to string
     payload_str = str(payload)
     
@@ -145,7 +171,7 @@ def encrypt_payload (payload: dict) -> str:
     # URL-safe base64 encoding
     return base64.urlsafe_b64encode(token.encode()).decode()
 
-def decrypt_payload(encrypted_payload: str) -> dict:
+def decrypt_payload_v1(encrypted_payload: str) -> dict:
     try:
         # Decode base64
         decoded_token = base64.urlsafe_b64decode(encrypted_payload.encode()).decode()
@@ -170,5 +196,3 @@ def decrypt_payload(encrypted_payload: str) -> dict:
         return token_parts['payload']
     except Exception as e:
         raise ValueError(f"Invalid token: {str(e)}")
-    
-    
\ No newline at end of file
@@ -0,0 +1,86 @@
+"""
+Local stand-in for the email provider's HTTP API.
+
+Accepts POST /emails and POST /emails/batch, optionally after a fixed latency, and
+answers like the provider does without sending anything; recipients @invalid.test get
+the provider's 422. Point the app at it with EMAIL_API_URL to exercise the real HTTP
+transport in tests and benchmarks:
+
+    python -m benchmarks.email_stub_server --port 8025 --latency-ms 120
+    EMAIL_API_URL=http://127.0.0.1:8025 python -m benchmarks.scheduler_bench ...
+"""
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import itertools
+import json
+import threading
+import time
+
+# recipients at this domain are rejected with a 422, to exercise the invalid-address paths
+INVALID_DOMAIN = "@invalid.test"
+
+_ids = itertools.count(1)
+_lock = threading.Lock()
+
+
+def _next_id() -> str:
+    with _lock:
+        return f"stub-{next(_ids)}"
+
+
+def make_handler(latency_seconds: float, fail_every: int):
+    requests = itertools.count(1)
+
+    class StubEmailHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the provider
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if latency_seconds:
+                time.sleep(latency_seconds)
+
+            if fail_every and next(requests) % fail_every == 0:
+                return self._reply(503, {"message": "stub failure"})
+            emails = json.loads(body) if body else {}
+            # like the provider, one bad recipient fails the whole request
+            for email in emails if isinstance(emails, list) else [emails]:
+                if str(email.get("to", "")).endswith(INVALID_DOMAIN):
+                    return self._reply(422, {"statusCode": 422, "name": "validation_error",
+                                             "message": "Invalid `to` field. The email address needs to follow the `email@example.com` format."})
+            if self.path == "/emails":
+                return self._reply(200, {"id": _next_id()})
+            if self.path == "/emails/batch":
+                return self._reply(200, {"data": [{"id": _next_id()} for _ in emails]})
+            self._reply(404, {"message": "not found"})
+
+        def _reply(self, status: int, payload: dict):
+            content = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubEmailHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fake email provider API on localhost.")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--fail-every", type=int, default=0, help="answer every Nth request with a 503")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(args.latency_ms / 1000, args.fail_every))
+    print(f"stub email API on http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
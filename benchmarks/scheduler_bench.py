@@ -0,0 +1,197 @@
+"""
+Scheduler simulation benchmark.
+
+Seeds a scratch Postgres database with synthetic check-in schedules spread over every
+timezone offset, then drives fetch_checkins_and_notify through a simulated week on a
+fake clock with a stub email sender. Reports per-hour dispatch wall time, DB round
+trips, emails/sec and peak RSS.
+
+Emails go nowhere by default. With --email-url they are posted to an HTTP endpoint such
+as benchmarks/email_stub_server.py, so the real transport and its latency are measured.
+
+    python -m benchmarks.scheduler_bench --dsn postgresql://localhost/momentum_bench \\
+        --checkins 100000 --members 1000000 --days 7
+
+The benchmark DROPS AND RECREATES the app tables in the target database. Never point
+it at a database you care about.
+"""
+import argparse
+import asyncio
+from datetime import datetime, time, timedelta, timezone
+import logging
+import os
+import random
+import resource
+import sys
+import time as timer
+
+IANA_ZONES = ["Europe/London", "America/New_York", "America/Los_Angeles", "Africa/Lagos",
+              "Asia/Kolkata", "Australia/Sydney", "America/Sao_Paulo", "Asia/Tokyo"]
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Simulate a week of check-in dispatch against a scratch database.")
+    parser.add_argument("--dsn", default=os.getenv("BENCH_DATABASE_URL"),
+                        help="scratch database; its tables are dropped (env BENCH_DATABASE_URL)")
+    parser.add_argument("--checkins", type=int, default=100_000)
+    parser.add_argument("--members", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--start", default="2025-03-24T00:00:00+00:00", help="simulated start instant (ISO)")
+    parser.add_argument("--wheel", action="store_true", help="dispatch through the timing wheel instead of the range scan")
+    parser.add_argument("--email-url", help="send through the HTTP transport to this API (e.g. the stub server)")
+    parser.add_argument("--skip-seed", action="store_true", help="reuse the data of a previous run")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    if not args.dsn:
+        parser.error("--dsn or BENCH_DATABASE_URL is required")
+    return args
+
+
+class RoundTripCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, record):
+        self.count += 1
+
+    async def register(self, conn):
+        conn.add_query_logger(self)
+
+
+def make_counting_backend(email_url=None):
+    from app.infra.email_transport import EmailBackend, NullEmailBackend, ResendHttpBackend
+
+    class CountingBackend(EmailBackend):
+        """Counts what the dispatcher hands to the transport."""
+
+        def __init__(self, inner):
+            self.inner = inner
+            self.sent = 0
+
+        async def send(self, params):
+            self.sent += 1
+            return await self.inner.send(params)
+
+        async def aclose(self):
+            await self.inner.aclose()
+
+    return CountingBackend(ResendHttpBackend(email_url, api_key="bench") if email_url else NullEmailBackend())
+
+
+async def seed(conn, args):
+    from app.core.database import Base, engine
+    import app.models.email_model, app.models.project_model, app.models.response_model, app.models.scheduler_model, app.models.subscription_model, app.models.user_model  # noqa: F401
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    rng = random.Random(args.seed)
+    start = datetime.fromisoformat(args.start)
+    offsets = [str(hours) if hours < 0 else f"+{hours}" for hours in range(-12, 15)]
+
+    projects, checkins = [], []
+    for project_id in range(1, args.checkins + 1):
+        projects.append((project_id, f"bench project {project_id}", "synthetic", 1, True, False,
+                         start.replace(tzinfo=None) - timedelta(days=30), start.replace(tzinfo=None) + timedelta(days=365)))
+        tz = rng.choice(IANA_ZONES) if rng.random() < 0.3 else rng.choice(offsets)
+        days = sorted(rng.sample(WEEKDAYS, rng.randint(1, 7)), key=WEEKDAYS.index)
+        checkin_time = time(rng.randint(6, 11), rng.choice([0, 0, 0, 30]))
+        checkins.append((project_id, project_id, checkin_time, days, tz, True, False))
+
+    members = []
+    for member_id in range(1, args.members + 1):
+        project_id = rng.randint(1, args.checkins)
+        members.append((member_id, project_id, f"member{member_id}@bench.invalid", True))
+
+    await conn.copy_records_to_table("projects", records=projects, columns=[
+        "id", "title", "description", "creator_user_id", "is_active", "has_ended", "start_date", "end_date"])
+    await conn.copy_records_to_table("checkins", records=checkins, columns=[
+        "id", "project_id", "user_checkin_time", "user_checkin_days", "user_timezone", "is_active", "project_ended"])
+    await conn.copy_records_to_table("project_members", records=members, columns=[
+        "id", "project_id", "user_email", "is_active"])
+    await conn.execute("ANALYZE")
+    print(f"seeded {len(checkins)} checkins and {len(members)} members")
+
+
+async def simulate(args):
+    from app.core.database import close_async_pool, create_async_pool
+    from app.infra.email_infra import EmailInfra
+    from app.infra.email_transport import close_email_backend, set_email_backend
+    from app.scheduler.send_queue import dispatch_queue
+    from app.scheduler.timing_wheel import TimingWheel
+    from app.services import notify_service
+
+    # app modules configure INFO logging on import; per-checkin logs would dominate the timings
+    logging.getLogger().setLevel(logging.WARNING)
+
+    counter = RoundTripCounter()
+    pool = await create_async_pool(init=counter.register)
+    if not args.skip_seed:
+        async with pool.acquire() as conn:
+            await seed(conn, args)
+
+    start = datetime.fromisoformat(args.start).astimezone(timezone.utc)
+    await notify_service.backfill_next_fire_at(start - timedelta(minutes=1))
+
+    wheel = None
+    if args.wheel:
+        wheel = TimingWheel(start)
+        wheel.schedule_many((row['id'], row['next_fire_at']) for row in await notify_service.fetch_checkin_schedules())
+
+    stub = make_counting_backend(args.email_url)
+    set_email_backend(stub)
+    email_infra = EmailInfra()
+    hours = {}
+
+    tick = start
+    end = start + timedelta(days=args.days)
+    while tick < end:
+        round_trips, emails = counter.count, stub.sent
+        started = timer.perf_counter()
+
+        if wheel is not None:
+            due = wheel.advance(tick)
+            if due:
+                wheel.schedule_many(await notify_service.fetch_checkins_and_notify(tick, due, email_infra=email_infra) or [])
+        else:
+            await notify_service.fetch_checkins_and_notify(tick, email_infra=email_infra)
+        # unpaced sends go out in the background; count them towards the tick that made them
+        await dispatch_queue.drain()
+
+        hour = hours.setdefault(tick.replace(minute=0), [0.0, 0, 0])
+        hour[0] += timer.perf_counter() - started
+        hour[1] += counter.count - round_trips
+        hour[2] += stub.sent - emails
+        tick += timedelta(minutes=1)
+
+    await close_email_backend()
+    await close_async_pool()
+
+    print(f"{'hour (UTC)':<18}{'wall s':>10}{'round trips':>13}{'emails':>10}{'emails/s':>11}")
+    for hour_start, (wall, trips, emails) in sorted(hours.items()):
+        if emails or trips > 60:
+            rate = emails / wall if wall else 0.0
+            print(f"{hour_start:%a %H:%M}{'':<8}{wall:>10.2f}{trips:>13}{emails:>10}{rate:>11.0f}")
+
+    total_wall = sum(hour[0] for hour in hours.values())
+    total_emails = sum(hour[2] for hour in hours.values())
+    worst = max(hours.items(), key=lambda item: item[1][0])
+    print(f"\ntotal: {total_wall:.1f}s dispatching, {counter.count} round trips, {total_emails} emails, "
+          f"{total_emails / total_wall if total_wall else 0:.0f} emails/s")
+    print(f"worst hour: {worst[0]:%a %H:%M} {worst[1][0]:.2f}s")
+    # ru_maxrss costs nothing to collect; tracemalloc would slow the timed loop several times over
+    print(f"max rss: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB")
+
+
+def main():
+    args = parse_args()
+    # app modules read DATABASE_URL at import time
+    os.environ["DATABASE_URL"] = args.dsn
+    os.environ.setdefault("JWT_SECRET_KEY", "bench-secret")
+    os.environ.setdefault("FRONTEND_URL", "https://bench.invalid")
+    asyncio.run(simulate(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
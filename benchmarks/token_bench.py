@@ -0,0 +1,69 @@
+"""
+Signed-link token benchmark.
+
+Signs and verifies check-in link payloads with the v1 (HMAC + JWT + base64) and v2
+(compact binary, single HMAC) formats and reports tokens/sec for each, sign_many
+throughput for a fan-out batch, and the token length that ends up in every URL.
+
+    python -m benchmarks.token_bench --iterations 20000 --batch 200
+"""
+import argparse
+from datetime import datetime, timezone
+import os
+import time
+
+os.environ.setdefault("JWT_SECRET_KEY", "token-bench-secret")
+
+from app.utils import link_token
+from app.utils.security import decrypt_payload, encrypt_payload, encrypt_payload_v1, encrypt_payloads
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare v1 and v2 signed-link token throughput.")
+    parser.add_argument("--iterations", type=int, default=20_000)
+    parser.add_argument("--batch", type=int, default=200, help="members per sign_many fan-out")
+    return parser.parse_args()
+
+
+def checkin_payload(i: int) -> dict:
+    user_datetime = datetime(2025, 3, 24, 9, 0, tzinfo=timezone.utc)
+    return {
+        "user_email": f"member{i}@example.com",
+        "user_datetime": user_datetime.isoformat(),
+        "user_checkinday": user_datetime.strftime("%A"),
+        "user_timezone": "Africa/Lagos",
+        "checkin_id": 100_000 + i,
+    }
+
+
+def rate(count: int, started: float) -> str:
+    return f"{count / (time.perf_counter() - started):>12,.0f}/s"
+
+
+def main():
+    args = parse_args()
+    payloads = [checkin_payload(i) for i in range(args.iterations)]
+
+    for name, sign in (("v1", encrypt_payload_v1), ("v2", encrypt_payload)):
+        started = time.perf_counter()
+        tokens = [sign(payload) for payload in payloads]
+        sign_rate = rate(len(tokens), started)
+
+        started = time.perf_counter()
+        for token in tokens:
+            decrypt_payload(token)
+        verify_rate = rate(len(tokens), started)
+
+        print(f"{name}: sign {sign_rate}  verify {verify_rate}  length {len(tokens[0])} chars")
+
+    batches = [payloads[i:i + args.batch] for i in range(0, len(payloads), args.batch)]
+    started = time.perf_counter()
+    for batch in batches:
+        encrypt_payloads(batch)
+    print(f"v2 sign_many ({args.batch}/batch): {rate(len(payloads), started)}")
+
+    assert link_token.verify(encrypt_payload(payloads[0])) == payloads[0]
+
+
+if __name__ == "__main__":
+    main()
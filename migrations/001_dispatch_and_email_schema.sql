@@ -0,0 +1,186 @@
+-- Schema for the scheduled dispatcher and the email outbox.
+--
+-- Brings an existing database up to the models in app/models: next_fire_at on
+-- checkins, reminder_sent_at and the one-tracker-per-day unique index on
+-- checkin_response_tracker, the dispatch ledger, and the email outbox,
+-- cooldown and suppression tables. Safe to run more than once.
+--
+--     psql "$DATABASE_URL" -v ON_ERROR_STOP=1 -f migrations/001_dispatch_and_email_schema.sql
+--
+-- Run it before deploying the code that needs it. The indexes are built inside
+-- the transaction, so writes to checkins and checkin_response_tracker wait
+-- until it commits.
+
+BEGIN;
+
+-- checkins ------------------------------------------------------------------
+
+ALTER TABLE checkins ADD COLUMN IF NOT EXISTS next_fire_at timestamptz;
+
+-- dispatch only ever range-scans live checkins
+CREATE INDEX IF NOT EXISTS ix_checkins_next_fire_at_live
+    ON checkins (next_fire_at)
+    WHERE is_active = true AND project_ended = false;
+
+-- lets the end-date sweeper find expired projects without scanning finished ones
+CREATE INDEX IF NOT EXISTS ix_projects_end_date_live
+    ON projects (end_date)
+    WHERE has_ended = false;
+
+-- Schedule live checkins that don't have a next_fire_at yet: the first
+-- check-in day/time in the user's timezone strictly after now, as
+-- compute_next_fire_at does. user_timezone is an IANA name or a legacy hour
+-- offset ("+1"); anything else is left NULL and picked up by
+-- backfill_next_fire_at when a dispatcher is elected.
+WITH pending AS (
+    SELECT c.id,
+           c.user_checkin_days,
+           make_time(extract(hour FROM c.user_checkin_time)::int,
+                     extract(minute FROM c.user_checkin_time)::int, 0) AS checkin_time,
+           btrim(c.user_timezone) AS tz,
+           CASE WHEN btrim(c.user_timezone) ~ '^[+-]?[0-9]+$'
+                THEN make_interval(hours => btrim(c.user_timezone)::int)
+           END AS fixed_offset
+    FROM checkins c
+    WHERE c.is_active = true
+        AND c.project_ended = false
+        AND c.next_fire_at IS NULL
+        AND c.user_checkin_time IS NOT NULL
+        AND cardinality(c.user_checkin_days) > 0
+        AND (btrim(c.user_timezone) ~ '^[+-]?[0-9]+$'
+             OR btrim(c.user_timezone) IN (SELECT name FROM pg_timezone_names))
+),
+local_today AS (
+    SELECT p.*,
+           CASE WHEN p.fixed_offset IS NOT NULL
+                THEN (now() AT TIME ZONE 'UTC' + p.fixed_offset)::date
+                ELSE (now() AT TIME ZONE p.tz)::date
+           END AS today
+    FROM pending p
+),
+next_fire AS (
+    SELECT l.id, min(candidate.fire_at) AS fire_at
+    FROM local_today l
+    CROSS JOIN LATERAL generate_series(0, 7) AS day_offset(n)
+    CROSS JOIN LATERAL (
+        SELECT CASE WHEN l.fixed_offset IS NOT NULL
+                    THEN (l.today + day_offset.n + l.checkin_time - l.fixed_offset) AT TIME ZONE 'UTC'
+                    ELSE (l.today + day_offset.n + l.checkin_time) AT TIME ZONE l.tz
+               END AS fire_at
+    ) candidate
+    WHERE to_char(l.today + day_offset.n, 'FMDay') = ANY(l.user_checkin_days)
+        AND candidate.fire_at > now()
+    GROUP BY l.id
+)
+UPDATE checkins c
+SET next_fire_at = n.fire_at
+FROM next_fire n
+WHERE c.id = n.id;
+
+-- checkin_response_tracker --------------------------------------------------
+
+ALTER TABLE checkin_response_tracker ADD COLUMN IF NOT EXISTS reminder_sent_at timestamp;
+
+-- Dispatch claims a day's tracker with INSERT ... ON CONFLICT, which needs one
+-- tracker per checkin per user-local day. Fold duplicates into the one that has
+-- made the most progress (analytics processed, then most responses, then oldest),
+-- and point insights at it before deleting the rest.
+CREATE TEMPORARY TABLE tracker_duplicates ON COMMIT DROP AS
+SELECT id, keep_id
+FROM (
+    SELECT id,
+           first_value(id) OVER day_trackers AS keep_id
+    FROM checkin_response_tracker
+    WINDOW day_trackers AS (
+        PARTITION BY checkin_id, user_checkin_date::date
+        ORDER BY is_analytics_processed IS TRUE DESC,
+                 COALESCE(number_of_responses_received, 0) DESC,
+                 id
+    )
+) ranked
+WHERE id <> keep_id;
+
+UPDATE checkin_response_tracker keep
+SET number_of_responses_received = merged.received,
+    reminder_sent_at = COALESCE(keep.reminder_sent_at, merged.reminder_sent_at)
+FROM (
+    SELECT d.keep_id,
+           max(COALESCE(t.number_of_responses_received, 0)) AS received,
+           min(t.reminder_sent_at) AS reminder_sent_at
+    FROM tracker_duplicates d
+    JOIN checkin_response_tracker t ON t.id = d.id
+    GROUP BY d.keep_id
+) merged
+WHERE keep.id = merged.keep_id
+    AND (COALESCE(keep.number_of_responses_received, 0) < merged.received
+         OR (keep.reminder_sent_at IS NULL AND merged.reminder_sent_at IS NOT NULL));
+
+UPDATE checkin_responses_insights i
+SET tracker_id = d.keep_id
+FROM tracker_duplicates d
+WHERE i.tracker_id = d.id;
+
+DELETE FROM checkin_response_tracker t
+USING tracker_duplicates d
+WHERE t.id = d.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_checkin_response_tracker_checkin_day
+    ON checkin_response_tracker (checkin_id, (user_checkin_date::date));
+
+-- dispatch_ledger -----------------------------------------------------------
+
+-- "checkins", "checkins:<shard>" for a sharded dispatcher, or "creator_digest"
+CREATE TABLE IF NOT EXISTS dispatch_ledger (
+    name varchar PRIMARY KEY,
+    last_completed_at timestamptz NOT NULL,
+    date_updated timestamp
+);
+
+-- email_outbox --------------------------------------------------------------
+
+-- status is PENDING -> SENT, or FAILED once retries are exhausted, or SUPPRESSED
+CREATE TABLE IF NOT EXISTS email_outbox (
+    id serial PRIMARY KEY,
+    destination_email varchar NOT NULL,
+    subject varchar NOT NULL,
+    template varchar NOT NULL,
+    context jsonb NOT NULL,
+    status varchar NOT NULL,
+    attempts integer NOT NULL,
+    next_attempt_at timestamptz NOT NULL,
+    last_error varchar,
+    provider_message_id varchar,
+    date_created timestamptz,
+    date_sent timestamptz
+);
+
+-- the worker only ever looks at pending rows that are due
+CREATE INDEX IF NOT EXISTS ix_email_outbox_pending
+    ON email_outbox (next_attempt_at)
+    WHERE status = 'PENDING';
+
+-- email_cooldowns -----------------------------------------------------------
+
+-- one row per (destination, template key); the last time it was let through
+CREATE TABLE IF NOT EXISTS email_cooldowns (
+    destination_email varchar NOT NULL,
+    template_key varchar NOT NULL,
+    last_sent_at timestamptz NOT NULL,
+    PRIMARY KEY (destination_email, template_key)
+);
+
+-- email_suppressions --------------------------------------------------------
+
+-- email is lower-cased; reason is bounce, complaint or invalid. date_created is
+-- the database's clock and the cursor other processes refresh their copy from.
+CREATE TABLE IF NOT EXISTS email_suppressions (
+    email varchar PRIMARY KEY,
+    reason varchar NOT NULL,
+    detail varchar,
+    date_created timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS ix_email_suppressions_date_created
+    ON email_suppressions (date_created);
+
+COMMIT;